@@ -0,0 +1,4 @@
+# Django起動時にCeleryアプリを読み込み、@shared_taskがこのアプリを使うようにする
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,19 @@
+"""
+Celery config for 3dcp project.
+
+サムネイル生成などの重い処理をリクエストの外で実行するためのCeleryアプリ
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+app = Celery('core')
+
+# settings.pyのCELERY_で始まる設定を読み込む
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# 各アプリのtasks.pyを自動で読み込む
+app.autodiscover_tasks()
@@ -0,0 +1,36 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjsonが扱えない型（Decimal、遅延評価の翻訳文字列など）はDRF標準のエンコーダーに任せる
+_fallback_encoder = JSONEncoder()
+
+# 日時はDRF標準のエンコーダーに任せ、UTCを「Z」で表すなどの表記を揃える
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    orjsonでJSONを出力するレンダラー
+
+    DRF標準のJSONRenderer（json.dumps）と同じくUTF-8・空白なしで出力する
+
+    - Acceptのindent指定やBrowsable APIなど、インデントが必要な場合は標準のレンダラーで出力する
+    - orjsonで扱えない値（64bitを超える整数など）を含む場合も標準のレンダラーで出力する
+    - U+2028・U+2029は標準と同じくエスケープする（JavaScriptとして解釈できるようにするため）
+    - NaN・Infinityは標準ではエラーになるが、orjsonではnullとして出力される
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_fallback_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -100,6 +100,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100,
 }
@@ -154,6 +158,27 @@ DATABASES = {
     #}
 #}
 
+# キャッシュ設定
+# 一覧キャッシュの世代番号（データ変更時の無効化）はプロセス間で共有する必要があるため、
+# CACHE_URL（Redis）が設定されていればそれを使う
+# 未設定の場合はプロセス内メモリキャッシュを使用する（トップページのページキャッシュ等）
+# その場合の無効化は変更を処理したプロセスにしか届かないため、
+# gunicornのワーカー1つ・Celery同期実行の単一プロセス構成を前提とする
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -232,5 +257,18 @@ else:
     MEDIA_ROOT = '/mnt/images'
 
 
+# Celery設定
+# ブローカー（Redis）が設定されていない環境ではタスクをその場で同期実行する
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TIMEZONE = TIME_ZONE
+# Pillowを使うサムネイル生成はAPI向けのキューとは分けて専用ワーカーで処理する
+CELERY_TASK_ROUTES = {
+    'cp_api.tasks.generate_thumbnail_task': {'queue': 'thumbnails'},
+}
+
+
 LOGIN_URL = 'datashare:login'
 LOGIN_REDIRECT_URL = 'datashare:mypage_db'
@@ -1,4 +1,9 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
 from django.views.generic import TemplateView
 
+
+# トップページはユーザー情報を含まない静的な内容のため、描画結果をキャッシュする
+@method_decorator(cache_page(60 * 60), name='dispatch')
 class IndexView(TemplateView):
     template_name = 'index.html'
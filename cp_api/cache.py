@@ -0,0 +1,60 @@
+"""
+cp_api/cache.py
+
+文化財一覧のレスポンスキャッシュ
+
+✅ 内容:
+- 一覧のキャッシュキーを生成（リクエストURLのハッシュ＋世代番号）
+- 文化財・ムービー・画像・タグ・ユーザーの変更時に世代番号を進め、既存のキャッシュをまとめて無効化
+- 世代番号はムービー一覧のETagにも使う
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+
+# 一覧レスポンスのキャッシュ保持時間（秒）
+# 世代番号はCACHE_URL（Redis）で全プロセスに共有される
+# プロセスごとのキャッシュ（CACHE_URL未設定）では他プロセスでの変更が伝わらないため、
+# 単一プロセス構成以外では古い一覧レスポンスが最大でこの時間返る
+LIST_CACHE_TIMEOUT = 30
+
+_VERSION_KEY = 'cp:list:version'
+
+
+def _initial_version():
+    """
+    世代番号の初期値
+    
+    キャッシュの消去・再起動後に以前と同じ番号から数え直すと、古いETagと一致してしまうため時刻から始める
+    """
+    return int(time.time() * 1000)
+
+
+def list_cache_version():
+    """一覧データの現在の世代番号を取得（未設定なら初期化する）"""
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, _initial_version(), None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def list_cache_key(request):
+    """
+    一覧リクエストのキャッシュキーを生成
+    
+    サムネイルURLなどにホスト名が含まれるため、ホストを含むURL全体をキーにする
+    """
+    version = list_cache_version()
+    digest = hashlib.blake2b(request.build_absolute_uri().encode(), digest_size=16).hexdigest()
+    return f'cp:list:{version}:{digest}'
+
+
+def invalidate_list_cache():
+    """世代番号を進めて、これまでの一覧キャッシュを使われないようにする"""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, _initial_version(), None)
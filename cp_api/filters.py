@@ -7,12 +7,15 @@ cp_api/filters.py
 - created_byフィルターを追加
 """
 
+import math
+
 from django_filters import rest_framework as filters
-from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import NumberFilter, CharFilter
 
-from .models import CulturalProperty
+from .models import CulturalProperty, Movie
 
 
 class CulturalPropertyFilter(filters.FilterSet):
@@ -20,13 +23,16 @@ class CulturalPropertyFilter(filters.FilterSet):
     
     name = filters.CharFilter(lookup_expr='icontains')
     name_en = filters.CharFilter(lookup_expr='icontains')
-    has_movies = filters.BooleanFilter(field_name='movies', lookup_expr='isnull', exclude=True)
+    has_movies = filters.BooleanFilter(method='filter_has_movies')
     
     # 緯度・経度・距離のフィルタ
     lat = NumberFilter(method='filter_by_distance')
     lon = NumberFilter(method='filter_by_distance')
     distance = NumberFilter(method='filter_by_distance')
 
+    # 緯度1度あたりの距離(m)。バウンディングボックスが狭くなりすぎないよう小さめの値を使う
+    METERS_PER_DEGREE = 110000.0
+
     # タグフィルタ
     tag_id = NumberFilter(method='filter_by_tag_id')
     tag_name = CharFilter(method='filter_by_tag_name')
@@ -53,20 +59,59 @@ class CulturalPropertyFilter(filters.FilterSet):
     def filter_by_distance(self, queryset, name, value):
         """
         指定した緯度(lat)、経度(lon)、半径(distance)内のデータのみを取得
+        
+        lat・lon・distanceの3つのフィルターから呼ばれるため、
+        同じ条件を重ねないようdistanceの呼び出しでのみ絞り込む
+        """
+        if name != 'distance':
+            return queryset
+
+        # フォームで数値に変換済みの値を使う（0も有効な緯度・経度として扱う）
+        lat = self.form.cleaned_data.get('lat')
+        lon = self.form.cleaned_data.get('lon')
+        if lat is None or lon is None:
+            return queryset
+
+        lat, lon, distance = float(lat), float(lon), float(value)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and distance > 0):
+            return queryset
+
+        # geomと同じSRID（JGD2011）で作り、SQL側でのST_Transformを省く
+        user_location = Point(lon, lat, srid=6668)
+        bbox = self._distance_bbox(lat, lon, distance)
+        if bbox is not None:
+            # GiSTインデックスで使えるバウンディングボックスで先に候補を絞る
+            queryset = queryset.filter(geom__bboverlaps=bbox)
+        # 距離を列として付与せず、WHERE句の距離条件だけで絞り込む
+        return queryset.filter(
+            geom__distance_lte=(user_location, D(m=distance))
+        )
+
+    def _distance_bbox(self, lat, lon, distance):
+        """
+        中心(lat, lon)から半径distance(m)の円を囲むバウンディングボックスを返す
+        
+        取りこぼしがないよう少し広めに取る。極や日付変更線をまたぐ場合はNoneを返す
+        """
+        dlat = distance / self.METERS_PER_DEGREE
+        max_lat = abs(lat) + dlat
+        if max_lat >= 90:
+            return None
+        dlon = dlat / math.cos(math.radians(max_lat))
+        if lon - dlon < -180 or lon + dlon > 180:
+            return None
+        bbox = Polygon.from_bbox((lon - dlon, lat - dlat, lon + dlon, lat + dlat))
+        bbox.srid = 6668
+        return bbox
+
+    def filter_has_movies(self, queryset, name, value):
+        """
+        ムービーの有無でフィルタリング
+        
+        JOINせずにEXISTSの相関サブクエリで判定する
         """
-        lat = self.data.get('lat')
-        lon = self.data.get('lon')
-        distance = self.data.get('distance')
-
-        if lat and lon and distance:
-            try:
-                user_location = Point(float(lon), float(lat), srid=4326)
-                return queryset.annotate(
-                    distance=Distance('geom', user_location)
-                ).filter(distance__lte=float(distance))
-            except ValueError:
-                return queryset
-        return queryset
+        has_movies = Exists(Movie.objects.filter(cultural_property=OuterRef('pk')))
+        return queryset.filter(has_movies if value else ~has_movies)
 
     def filter_by_tag_id(self, queryset, name, value):
         """タグIDでフィルタリング"""
@@ -0,0 +1,18 @@
+"""
+cp_api/functions.py
+
+PostGIS関数のラッパー（Djangoに用意されていないもの）
+
+✅ 内容:
+- AsEWKT: ST_AsEWKTでジオメトリをSRID付きのEWKT文字列にする
+"""
+
+from django.contrib.gis.db.models.functions import GeoFunc
+from django.db.models import TextField
+
+
+class AsEWKT(GeoFunc):
+    """ジオメトリをEWKT文字列（"SRID=6668;POINT(x y)"）で返す"""
+    function = 'ST_AsEWKT'
+    output_field = TextField()
+    arity = 1
@@ -12,12 +12,19 @@ cp_api/management/commands/generate_all_thumbnails.py
     
     # 特定のムービーIDのみ
     python manage.py generate_all_thumbnails --movie-id 123
+    
+    # 8並列で生成（--delayは無視される）
+    python manage.py generate_all_thumbnails --workers 8
+    
+    # Celeryワーカーに分散して生成（登録のみ行い、完了は待たない）
+    python manage.py generate_all_thumbnails --queue
 """
 
 import time
 from django.core.management.base import BaseCommand
 from cp_api.models import Movie
-from cp_api.services.thumbnail import generate_thumbnail_for_movie
+from cp_api.services.thumbnail import generate_thumbnail_for_movie, generate_thumbnails_batch
+from cp_api.tasks import enqueue_thumbnail_generation
 
 
 class Command(BaseCommand):
@@ -45,15 +52,28 @@ class Command(BaseCommand):
             default=1.0,
             help='各ダウンロード間の待機秒数（デフォルト: 1.0秒）',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='並列に処理するムービー数（デフォルト: 1=逐次処理）',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Celeryのthumbnailsキューにタスクを登録してワーカーに処理させる',
+        )
 
     def handle(self, *args, **options):
         force = options['force']
         movie_id = options['movie_id']
         dry_run = options['dry_run']
         delay = options['delay']
+        workers = options['workers']
+        queue = options['queue']
         
         self.stdout.write(self.style.NOTICE('🎬 サムネイル一括生成を開始します'))
-        self.stdout.write(f'   オプション: force={force}, dry_run={dry_run}, delay={delay}s')
+        self.stdout.write(f'   オプション: force={force}, dry_run={dry_run}, delay={delay}s, workers={workers}')
         
         # クエリセットを構築
         if movie_id:
@@ -83,10 +103,33 @@ class Command(BaseCommand):
                 self.stdout.write(f'     URL: {movie.url}')
             return
         
+        if queue:
+            # Celeryワーカーに分散
+            movie_ids = list(movies.values_list('id', flat=True))
+            result = enqueue_thumbnail_generation(movie_ids, force=force)
+            self.stdout.write(self.style.SUCCESS(
+                f'📨 {len(movie_ids)}件のタスクを登録しました (group: {result.id})'
+            ))
+            return
+        
         success = 0
         failed = 0
         skipped = 0
         
+        if workers > 1:
+            # 並列処理
+            self.stdout.write(f'⚡ {workers}並列で処理します')
+            results = generate_thumbnails_batch(movies, force=force, max_workers=workers)
+            for movie_id, result in results.items():
+                if result:
+                    success += 1
+                    self.stdout.write(self.style.SUCCESS(f'   ✅ Movie #{movie_id}: 生成成功'))
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'   ❌ Movie #{movie_id}: 生成失敗'))
+            self._write_summary(success, failed, total)
+            return
+        
         for i, movie in enumerate(movies, 1):
             self.stdout.write(f'\n[{i}/{total}] Processing Movie #{movie.id}: {movie.title or "(無題)"}')
             self.stdout.write(f'   URL: {movie.url}')
@@ -111,7 +154,10 @@ class Command(BaseCommand):
             if i < total:
                 time.sleep(delay)
         
-        # サマリー
+        self._write_summary(success, failed, total)
+    
+    def _write_summary(self, success, failed, total):
+        """処理結果のサマリーを表示"""
         self.stdout.write('\n' + '=' * 50)
         self.stdout.write(self.style.SUCCESS(f'🎉 処理完了!'))
         self.stdout.write(f'   ✅ 成功: {success}件')
@@ -0,0 +1,20 @@
+# Generated migration for adding the duplicate-check index to CulturalProperty
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cp_api', '0004_movie_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='culturalproperty',
+            index=models.Index(
+                fields=['name', 'latitude', 'longitude'],
+                name='cp_name_coord_idx'
+            ),
+        ),
+    ]
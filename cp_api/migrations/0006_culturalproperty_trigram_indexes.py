@@ -0,0 +1,37 @@
+# Generated migration for adding trigram indexes for name searches
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cp_api', '0005_culturalproperty_cp_name_coord_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='culturalproperty',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name'),
+                    name='gin_trgm_ops'
+                ),
+                name='cp_name_trgm'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='culturalproperty',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name_en'),
+                    name='gin_trgm_ops'
+                ),
+                name='cp_name_en_trgm'
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated migration for adding updated_at indexes used by the default list ordering
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cp_api', '0006_culturalproperty_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='culturalproperty',
+            index=models.Index(
+                fields=['updated_at'],
+                name='cp_updated_at_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(
+                fields=['updated_at'],
+                name='movie_updated_at_idx'
+            ),
+        ),
+    ]
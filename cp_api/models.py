@@ -12,6 +12,8 @@ cp_api/models.py
 import os
 from django.conf import settings
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 
 
 class Tag(models.Model):
@@ -80,6 +82,15 @@ class CulturalProperty(models.Model):
         verbose_name = '文化財'
         verbose_name_plural = '文化財'
         ordering = ['-created_at', '-id']
+        indexes = [
+            # CSVインポート時の重複チェック（名称＋座標範囲）用
+            models.Index(fields=['name', 'latitude', 'longitude'], name='cp_name_coord_idx'),
+            # 名称の部分一致検索（icontains = UPPER(...) LIKE '%...%'）用のトライグラムインデックス
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='cp_name_trgm'),
+            GinIndex(OpClass(Upper('name_en'), name='gin_trgm_ops'), name='cp_name_en_trgm'),
+            # 一覧のデフォルトのソート順（-updated_at）でLIMIT付きの取得をインデックスで行う
+            models.Index(fields=['updated_at'], name='cp_updated_at_idx'),
+        ]
 
 
 def thumbnail_upload_to(instance, filename):
@@ -141,6 +152,10 @@ class Movie(models.Model):
         verbose_name = 'ムービー'
         verbose_name_plural = 'ムービー'
         ordering = ['-created_at', '-id']
+        indexes = [
+            # 一覧のデフォルトのソート順（-updated_at）でLIMIT付きの取得をインデックスで行う
+            models.Index(fields=['updated_at'], name='movie_updated_at_idx'),
+        ]
 
 
 def upload_to(instance, filename):
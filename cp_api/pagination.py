@@ -0,0 +1,79 @@
+"""
+cp_api/pagination.py
+
+カスタムページネーションクラス
+
+✅ 内容:
+- EstimatedCountLimitOffsetPagination: 絞り込みのない一覧では件数をpg_classの推定値で返す
+"""
+
+from django.db import connection
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class EstimatedCountLimitOffsetPagination(LimitOffsetPagination):
+    """
+    件数の取得にCOUNT(*)を使わないことがあるLimitOffsetPagination
+    
+    - 絞り込みのない一覧で、テーブルが大きい場合のみpg_class.reltuplesの推定値を使う
+    - 絞り込みがある場合や行数が少ない場合は従来どおりCOUNT(*)で数える
+    - 推定値は返却するcountにのみ使い、次ページの有無はlimit+1件取得して判定する
+      （統計情報が古く推定値が少ない場合でも、nextがnullになって後続ページを取りこぼさない）
+    """
+    # この行数以上のテーブルでのみ推定値を使う
+    ESTIMATE_THRESHOLD = 10000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.request = request
+        self.offset = self.get_offset(request)
+
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        # 推定値が実際に取得できた位置より少ない場合は、取得できた範囲までを件数とする
+        # 末尾を超えたoffsetで行が取得できなかった場合はoffsetを件数に含めない
+        self.count = self.get_count(queryset)
+        if rows:
+            self.count = max(
+                self.count,
+                self.offset + len(rows) + (1 if self.has_next else 0)
+            )
+
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_count(self, queryset):
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            estimate = self._estimate_count(queryset.model._meta.db_table)
+            if estimate >= self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().get_count(queryset)
+
+    def _estimate_count(self, table):
+        """
+        統計情報からテーブルの推定行数を取得
+        
+        ANALYZE前のテーブルでは-1が返る
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
@@ -125,6 +125,7 @@ class CulturalPropertySerializer(serializers.ModelSerializer):
     images = ImageUploadSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     created_by = UserBriefSerializer(read_only=True)
+    geom = serializers.SerializerMethodField()
 
     class Meta:
         model = CulturalProperty
@@ -152,6 +153,18 @@ class CulturalPropertySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'geom', 'created_by', 'created_at', 'updated_at']
 
+    def get_geom(self, obj):
+        """
+        ジオメトリをEWKT文字列で返す
+        
+        ViewSetでPostGISのST_AsEWKTの結果（geom_ewkt）を付与している場合はそれを使い、
+        GEOSオブジェクトの生成を省く。GEOSの文字列表現（"POINT (x y)"）に表記を揃える
+        """
+        geom_ewkt = getattr(obj, 'geom_ewkt', None)
+        if geom_ewkt is not None:
+            return geom_ewkt.replace('POINT(', 'POINT (', 1)
+        return str(obj.geom) if obj.geom else None
+
 
 class CulturalPropertyCreateSerializer(serializers.ModelSerializer):
     """
@@ -10,6 +10,7 @@ from .thumbnail import (
     download_thumbnail,
     resize_thumbnail,
     generate_thumbnail_for_movie,
+    generate_thumbnails_batch,
     delete_thumbnail_for_movie,
 )
 
@@ -28,6 +29,7 @@ __all__ = [
     'download_thumbnail',
     'resize_thumbnail',
     'generate_thumbnail_for_movie',
+    'generate_thumbnails_batch',
     'delete_thumbnail_for_movie',
     # csv_importer
     'CulturalPropertyCSVImporter',
@@ -11,16 +11,34 @@ cp_api/services/csv_importer.py
 """
 
 import io
+import os
+import json
+import time
+import sys
 import csv
 import uuid
+import codecs
 import logging
+import functools
+import tempfile
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterator, Tuple, BinaryIO
 from enum import Enum
 
-from django.db import transaction
-from django.contrib.gis.geos import Point
+import charset_normalizer
+from django.db import connection, transaction
+from django.contrib.gis.geos import Point, Polygon
 from django.core.cache import cache
+from django.utils import timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow未インストール時は標準のcsvモジュールを使う
+    pa = None
+    pc = None
+    pacsv = None
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +51,13 @@ class ImportStatus(Enum):
     WARNING = "warning"       # 警告（インポート可能だが注意が必要）
 
 
-@dataclass
+@dataclass(slots=True)
 class ImportRow:
     """インポート対象の1行を表すデータクラス"""
     row_number: int                      # 行番号（1始まり、ヘッダー除く）
     status: ImportStatus = ImportStatus.VALID
     errors: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
-    raw_data: Dict[str, Any] = field(default_factory=dict)
     
     # マッピング後のフィールド
     name: Optional[str] = None
@@ -172,6 +189,28 @@ class CulturalPropertyCSVImporter:
         'note': ['備考', 'note', '説明'],
     }
     
+    # CSVカラム名 → (内部フィールド名, 優先順位) の逆引き辞書
+    _COLUMN_LOOKUP = {
+        col_name: (field_name, rank)
+        for field_name, possible_columns in COLUMN_MAPPING.items()
+        for rank, col_name in enumerate(possible_columns)
+    }
+    
+    # 数値に変換するフィールド
+    COORDINATE_FIELDS = ('latitude', 'longitude')
+    
+    # URLとして許可するスキーム
+    URL_SCHEMES = ('http://', 'https://')
+    
+    # 値の種類が少なく、文字列をinternするフィールド
+    INTERNED_FIELDS = ('category', 'type')
+    
+    # フィールドごとの値の変換関数（ここにないフィールドは文字列のまま）
+    _CONVERTERS = {
+        **dict.fromkeys(COORDINATE_FIELDS, float),
+        **dict.fromkeys(INTERNED_FIELDS, sys.intern),
+    }
+    
     # 必須フィールド（typeは必須から外し、デフォルト値を設定）
     REQUIRED_FIELDS = ['name', 'address', 'latitude', 'longitude']
     
@@ -184,20 +223,64 @@ class CulturalPropertyCSVImporter:
     # 経度の有効範囲（日本国内）
     LONGITUDE_RANGE = (122.0, 154.0)
     
+    # 重複判定の座標許容誤差（度）
+    DUPLICATE_TOLERANCE = 0.0001  # 約10m
+    
     # セッションキャッシュの有効期限（秒）
     SESSION_TIMEOUT = 1800  # 30分
     
-    # エンコーディング判定の候補（優先順位順）
+    # プレビュー結果（Arrow IPCファイル）の保存先
+    SESSION_DIR = os.environ.get(
+        'CP_IMPORT_SESSION_DIR',
+        os.path.join(tempfile.gettempdir(), 'csv_import_sessions')
+    )
+    
+    # bulk_createの1回あたりのINSERT件数
+    BULK_BATCH_SIZE = int(os.environ.get('CP_BULK_BATCH_SIZE', 500))
+    
+    # この行数を超えるインポートはPostgreSQLのCOPYで登録する
+    COPY_THRESHOLD = 5000
+    
+    # COPYで値を渡すカラム（_copy_insertの行データと同じ順序）
+    COPY_COLUMNS = [
+        'id', 'name', 'name_kana', 'name_en', 'category', 'type', 'place_name',
+        'address', 'latitude', 'longitude', 'url', 'note', 'geom',
+        'created_by_id', 'created_at', 'updated_at',
+    ]
+    
+    # エンコーディング判定に使うファイル先頭のバイト数
+    ENCODING_SAMPLE_SIZE = 65536  # 64KB
+    
+    # pyarrowでCSVを読み込む単位（バイト）
+    ARROW_BLOCK_SIZE = 1 << 20
+    
+    # 区切り文字の判定に使うファイル先頭の文字数と候補
+    DIALECT_SAMPLE_SIZE = 8192
+    DELIMITER_CANDIDATES = ',;\t|'
+    
+    # ヘッダーの日本語キーワードで判定するエンコーディング（優先順位順）
     ENCODING_CANDIDATES = [
-        'utf-8',
-        'utf-8-sig',      # UTF-8 with BOM
-        'utf-16',
-        'utf-16-le',
+        'cp932',          # Windows Shift-JIS
+        'shift-jis',
+        'euc-jp',
+        'utf-16-le',      # BOMなしUTF-16
         'utf-16-be',
+    ]
+    
+    # 正しくデコードできたヘッダーに含まれるはずのキーワード
+    HEADER_KEYWORDS = ['名称', '緯度', '経度', '住所', '所在地']
+    
+    # charset-normalizerに判定させるエンコーディング
+    # （日本語CSVで使われるものに限定し、cp949などの誤判定を防ぐ）
+    DETECTABLE_ENCODINGS = [
+        'utf_8', 'utf_16', 'utf_16_le', 'utf_16_be', 'cp932', 'shift_jis', 'euc_jp', 'iso2022_jp',
+    ]
+    
+    # 自動判定できなかった場合に試すエンコーディング（優先順位順）
+    FALLBACK_ENCODINGS = [
         'cp932',          # Windows Shift-JIS
         'shift-jis',
         'euc-jp',
-        'iso-2022-jp',
     ]
     
     def __init__(self, check_duplicates: bool = True):
@@ -230,15 +313,47 @@ class CulturalPropertyCSVImporter:
             logger.info("🔍 BOM検出: UTF-8 with BOM")
             return 'utf-8-sig'
         
-        # 各エンコーディングで試す
+        # 判定はファイル先頭のサンプルのみで行う（全体のデコードは避ける）
+        sample = file_content[:self.ENCODING_SAMPLE_SIZE]
+        
+        # ISO-2022-JPは7ビットのみでUTF-8としても解釈できてしまうため、エスケープシーケンスで先に判定
+        if (b'\x1b$' in sample or b'\x1b(' in sample) and self.can_decode(sample, 'iso-2022-jp'):
+            logger.info("🔍 エンコーディング検出: iso-2022-jp")
+            return 'iso-2022-jp'
+        
+        # UTF-8として解釈できればUTF-8
+        # （NULを含む場合はBOMなしUTF-16の可能性があるため判定器に任せる）
+        # （サンプル末尾でマルチバイト文字が途切れていてもエラーにしない）
+        if b'\x00' not in sample:
+            try:
+                codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+                logger.info("🔍 エンコーディング検出: utf-8")
+                return 'utf-8'
+            except UnicodeDecodeError:
+                pass
+        
+        # ヘッダーに「名称」「緯度」「経度」などが含まれていれば正しくデコードできている
         for encoding in self.ENCODING_CANDIDATES:
             try:
-                decoded = file_content.decode(encoding)
-                # 日本語の文字が含まれているかチェック
-                # ヘッダーに「名称」「緯度」「経度」などが含まれていれば正しい
-                if any(keyword in decoded for keyword in ['名称', '緯度', '経度', '住所', '所在地']):
-                    logger.info(f"🔍 エンコーディング検出: {encoding}")
-                    return encoding
+                decoded = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            except (UnicodeDecodeError, UnicodeError):
+                continue
+            if any(keyword in decoded for keyword in self.HEADER_KEYWORDS):
+                logger.info(f"🔍 エンコーディング検出: {encoding}")
+                return encoding
+        
+        # ヘッダーで判定できない場合はcharset-normalizerで判定
+        best = charset_normalizer.from_bytes(sample, cp_isolation=self.DETECTABLE_ENCODINGS).best()
+        if best is not None:
+            logger.info(f"🔍 エンコーディング検出: {best.encoding}")
+            return best.encoding
+        
+        # 判定できなかった場合は日本語のエンコーディングを順に試す
+        for encoding in self.FALLBACK_ENCODINGS:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                logger.info(f"🔍 エンコーディング検出: {encoding}")
+                return encoding
             except (UnicodeDecodeError, UnicodeError):
                 continue
         
@@ -246,53 +361,76 @@ class CulturalPropertyCSVImporter:
         logger.warning("⚠️ エンコーディング自動判定失敗、UTF-8をデフォルトとして使用")
         return 'utf-8'
     
+    def can_decode(self, sample: bytes, encoding: str) -> bool:
+        """
+        ファイル先頭のサンプルが指定エンコーディングでデコードできるか判定
+        
+        サンプル末尾でマルチバイト文字が途切れていてもエラーにしない
+        """
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except (UnicodeDecodeError, LookupError):
+            return False
+        return True
+    
     def preview(
         self, 
         file_path: str = None, 
         file_content: bytes = None,
         filename: str = None,
-        encoding: str = None  # Noneの場合は自動判定
+        encoding: str = None,  # Noneの場合は自動判定
+        file_obj: BinaryIO = None
     ) -> Tuple[ImportPreviewResult, str]:
         """
         CSVファイルを解析してプレビュー結果を返す
         
         Args:
             file_path: ファイルパス（CLI用）
-            file_content: ファイル内容（Web API用）
+            file_content: ファイル内容
             filename: ファイル名
             encoding: ファイルエンコーディング（Noneの場合は自動判定）
+            file_obj: バイナリモードのファイルオブジェクト（Web API用、アップロードファイルをそのまま渡す）
             
         Returns:
             (ImportPreviewResult, session_id): プレビュー結果とセッションID
         """
-        logger.info(f"📂 CSVプレビュー開始: {filename or file_path}")
+        # ファイル全体をメモリに読み込まず、ファイルオブジェクトから直接解析する
+        if file_obj is None:
+            if file_content is not None:
+                file_obj = io.BytesIO(file_content)
+            elif file_path:
+                with open(file_path, 'rb') as f:
+                    return self.preview(
+                        filename=filename or os.path.basename(file_path),
+                        encoding=encoding,
+                        file_obj=f
+                    )
+            else:
+                raise ValueError("file_path, file_content または file_obj が必要です")
         
-        # ファイル内容を取得（エンコーディング判定用）
-        if file_path and not file_content:
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
+        logger.info(f"📂 CSVプレビュー開始: {filename}")
         
-        # エンコーディング自動判定
+        # エンコーディング自動判定（ファイル先頭のサンプルのみ読む）
         detected_encoding = encoding
         if not encoding or encoding == 'auto':
-            detected_encoding = self.detect_encoding(file_content)
+            sample = file_obj.read(self.ENCODING_SAMPLE_SIZE)
+            file_obj.seek(0)
+            detected_encoding = self.detect_encoding(sample)
             logger.info(f"📋 自動検出エンコーディング: {detected_encoding}")
         
-        # CSVを読み込み
-        rows_data, columns = self._parse_csv(
-            file_content=file_content,
-            encoding=detected_encoding
-        )
+        # CSVを読み込み（行は検証しながら1行ずつ読み出す）
+        rows_data, columns = self._parse_csv(file_obj, encoding=detected_encoding)
         
         # カラムマッピングを検出
         column_map = self._detect_column_mapping(columns)
         logger.info(f"📋 検出されたカラムマッピング: {column_map}")
         
         # 各行をバリデーション
-        import_rows: List[ImportRow] = []
-        for idx, row_data in enumerate(rows_data, start=1):
-            import_row = self._process_row(row_data, idx, column_map)
-            import_rows.append(import_row)
+        import_rows = self._process_rows(rows_data, column_map)
+        
+        # 重複チェック（1回のクエリでまとめて判定）
+        if self.check_duplicates:
+            self._mark_duplicates(import_rows)
         
         # 統計を計算
         valid_rows = sum(1 for r in import_rows if r.status == ImportStatus.VALID)
@@ -301,7 +439,7 @@ class CulturalPropertyCSVImporter:
         warning_rows = sum(1 for r in import_rows if r.status == ImportStatus.WARNING)
         
         result = ImportPreviewResult(
-            filename=filename or (file_path.split('/')[-1] if file_path else 'unknown.csv'),
+            filename=filename or 'unknown.csv',
             total_rows=len(import_rows),
             valid_rows=valid_rows,
             error_rows=error_rows,
@@ -343,14 +481,12 @@ class CulturalPropertyCSVImporter:
         Returns:
             ImportExecuteResult: 実行結果
         """
-        from cp_api.models import CulturalProperty
-        
         logger.info(f"🚀 CSVインポート実行開始")
         
         # セッションから行データを取得
         if session_id:
-            session_data = self._get_session(session_id)
-            if not session_data:
+            session_result = self._get_session(session_id)
+            if not session_result:
                 logger.error("❌ セッションが見つかりません")
                 return ImportExecuteResult(
                     success=False,
@@ -360,7 +496,7 @@ class CulturalPropertyCSVImporter:
                     duplicate_count=0,
                     errors=[{'message': 'セッションが期限切れか見つかりません'}]
                 )
-            rows = [ImportRow.from_dict(r) for r in session_data['rows']]
+            rows = session_result.rows
         
         if not rows:
             logger.error("❌ インポート対象の行がありません")
@@ -373,9 +509,10 @@ class CulturalPropertyCSVImporter:
                 errors=[{'message': 'インポート対象の行がありません'}]
             )
         
-        # 特定行のみ選択
+        # 特定行のみ選択（行数×選択数の線形探索にならないようsetで判定）
         if selected_row_numbers:
-            rows = [r for r in rows if r.row_number in selected_row_numbers]
+            selected = set(selected_row_numbers)
+            rows = [r for r in rows if r.row_number in selected]
         
         # インポート対象をフィルタリング
         rows_to_import = []
@@ -412,43 +549,18 @@ class CulturalPropertyCSVImporter:
                 rows_to_import.append(row)
         
         # 一括インポート
-        created_ids = []
-        errors = []
+        # 大量の行はCOPY、それ以外はbulk_createでまとめてINSERTする
+        use_copy = (
+            connection.vendor == 'postgresql'
+            and len(rows_to_import) > self.COPY_THRESHOLD
+        )
         
         try:
             with transaction.atomic():
-                for row in rows_to_import:
-                    try:
-                        # ジオメトリを生成
-                        geom = Point(row.longitude, row.latitude, srid=6668)
-                        
-                        # CulturalPropertyを作成
-                        cp = CulturalProperty(
-                            name=row.name,
-                            name_kana=row.name_kana or '',
-                            name_en=row.name_en or '',
-                            category=row.category or '',
-                            type=row.type or self.DEFAULT_TYPE,
-                            place_name=row.place_name or '',
-                            address=row.address,
-                            latitude=row.latitude,
-                            longitude=row.longitude,
-                            url=row.url or '',
-                            note=row.note or '',
-                            geom=geom,
-                            created_by=created_by
-                        )
-                        cp.save()
-                        created_ids.append(cp.id)
-                        
-                    except Exception as e:
-                        logger.error(f"❌ 行{row.row_number}のインポートに失敗: {e}")
-                        errors.append({
-                            'row': row.row_number,
-                            'name': row.name,
-                            'error': str(e)
-                        })
-                        error_count += 1
+                if use_copy:
+                    created_ids = self._copy_insert(rows_to_import, created_by)
+                else:
+                    created_ids = self._bulk_insert(rows_to_import, created_by)
         
         except Exception as e:
             logger.error(f"❌ トランザクションエラー: {e}")
@@ -473,45 +585,228 @@ class CulturalPropertyCSVImporter:
             skipped_count=skipped_count,
             error_count=error_count,
             duplicate_count=duplicate_count,
-            errors=errors,
             created_ids=created_ids
         )
     
+    def _bulk_insert(self, rows: List[ImportRow], created_by: 'User' = None) -> List[int]:
+        """
+        bulk_createで文化財を一括登録し、作成されたIDのリストを返す
+        
+        行ごとのsave()ではなくbatch_size件ずつまとめてINSERTする
+        （PostgreSQLでは戻り値のオブジェクトにPKが設定される）
+        """
+        from cp_api.models import CulturalProperty
+        
+        objs = [
+            CulturalProperty(
+                name=row.name,
+                name_kana=row.name_kana or '',
+                name_en=row.name_en or '',
+                category=row.category or '',
+                type=row.type or self.DEFAULT_TYPE,
+                place_name=row.place_name or '',
+                address=row.address,
+                latitude=row.latitude,
+                longitude=row.longitude,
+                url=row.url or '',
+                note=row.note or '',
+                geom=Point(row.longitude, row.latitude, srid=6668),
+                created_by=created_by
+            )
+            for row in rows
+        ]
+        
+        created = CulturalProperty.objects.bulk_create(
+            objs,
+            batch_size=self.BULK_BATCH_SIZE
+        )
+        return [cp.id for cp in created]
+    
+    @staticmethod
+    def _point_ewkt(row: ImportRow) -> str:
+        """
+        座標からジオメトリのEWKT文字列を組み立てる
+        
+        COPYのテキスト形式でそのままPostGISに渡す用（ORM経由ではGEOSオブジェクトに変換されるため使わない）
+        """
+        return f'SRID=6668;POINT({row.longitude} {row.latitude})'
+    
+    def _copy_insert(self, rows: List[ImportRow], created_by: 'User' = None) -> List[int]:
+        """
+        PostgreSQLのCOPY FROM STDINで文化財を一括登録し、作成されたIDのリストを返す
+        
+        COPYはIDを返さないため、先にシーケンスからIDを採番して明示的に挿入する。
+        ジオメトリはEWKT文字列のままPostGISに渡す
+        """
+        from cp_api.models import CulturalProperty
+        
+        table = CulturalProperty._meta.db_table
+        quote_name = connection.ops.quote_name
+        created_by_id = created_by.pk if created_by else None
+        now = timezone.now()
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(rows)]
+            )
+            ids = [cp_id for (cp_id,) in cursor.fetchall()]
+            
+            columns = ', '.join(quote_name(column) for column in self.COPY_COLUMNS)
+            with cursor.copy(f"COPY {quote_name(table)} ({columns}) FROM STDIN") as copy:
+                for cp_id, row in zip(ids, rows):
+                    copy.write_row((
+                        cp_id,
+                        row.name,
+                        row.name_kana or '',
+                        row.name_en or '',
+                        row.category or '',
+                        row.type or self.DEFAULT_TYPE,
+                        row.place_name or '',
+                        row.address,
+                        row.latitude,
+                        row.longitude,
+                        row.url or '',
+                        row.note or '',
+                        self._point_ewkt(row),
+                        created_by_id,
+                        now,
+                        now,
+                    ))
+        
+        return ids
+    
     def _parse_csv(
         self,
-        file_path: str = None,
-        file_content: bytes = None,
+        file_obj: BinaryIO,
         encoding: str = 'utf-8'
-    ) -> Tuple[List[Dict[str, str]], List[str]]:
+    ) -> Tuple[Iterator[Dict[str, Any]], List[str]]:
         """
         CSVファイルを読み込んで行データとカラム名を返す
         
+        ファイル全体のバイト列・デコードした文字列・行リストは作らず、
+        行データは1行ずつ読み出すイテレータとして返す
+        
+        Args:
+            file_obj: 先頭にシーク可能なバイナリモードのファイルオブジェクト
+        
         Returns:
-            (rows, columns): 行データのリストとカラム名のリスト
+            (rows, columns): 行データのイテレータとカラム名のリスト
         """
-        if file_path and not file_content:
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
+        # 逐次デコード（改行コードの違いはcsvモジュールが吸収する）
+        text = io.TextIOWrapper(
+            file_obj,
+            encoding=encoding,
+            errors='replace',
+            newline=''
+        )
         
-        if not file_content:
-            raise ValueError("file_path または file_content が必要です")
+        # 区切り文字を先頭のサンプルだけで判定
+        delimiter = self._sniff_delimiter(text.read(self.DIALECT_SAMPLE_SIZE))
+        text.seek(0)
         
-        # デコード
-        content = file_content.decode(encoding, errors='replace')
+        # CSVを解析
+        reader = csv.DictReader(text, delimiter=delimiter)
+        columns = reader.fieldnames or []
         
         # BOMを除去（UTF-8-sigの場合は自動で除去されるが念のため）
-        if content.startswith('\ufeff'):
-            content = content[1:]
+        if columns and columns[0].startswith('\ufeff'):
+            columns[0] = columns[0][1:]
+            reader.fieldnames = columns
         
-        # 改行コードを統一
-        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        # pyarrowが使える場合はネイティブのCSVパーサーで解析
+        if pacsv is not None and columns:
+            # ラッパーを外してファイルオブジェクトを先頭から読み直す
+            # （ラッパーの破棄時に元のファイルが閉じられないようにする）
+            text.detach()
+            file_obj.seek(0)
+            arrow_rows = self._parse_csv_arrow(file_obj, encoding, columns, delimiter)
+            if arrow_rows is not None:
+                return arrow_rows, columns
+            
+            # 標準パーサーで読み直す
+            file_obj.seek(0)
+            text = io.TextIOWrapper(file_obj, encoding=encoding, errors='replace', newline='')
+            reader = csv.DictReader(text, delimiter=delimiter)
+            reader.fieldnames = columns
+            next(reader.reader, None)  # ヘッダー行を読み飛ばす
         
-        # CSVを解析
-        reader = csv.DictReader(io.StringIO(content))
-        columns = reader.fieldnames or []
-        rows = list(reader)
+        return iter(reader), columns
+    
+    def _sniff_delimiter(self, sample: str) -> str:
+        """
+        サンプル文字列から区切り文字（カンマ・セミコロン・タブ・パイプ）を判定
         
-        return rows, columns
+        判定できない場合はカンマとみなす
+        """
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=self.DELIMITER_CANDIDATES)
+        except csv.Error:
+            return ','
+        return dialect.delimiter
+    
+    def _parse_csv_arrow(
+        self,
+        file_obj: BinaryIO,
+        encoding: str,
+        columns: List[str],
+        delimiter: str = ','
+    ) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        pyarrowでCSVを解析して行データのイテレータを返す
+        
+        値の表記（先頭ゼロ等）を保つため全カラムを文字列として読み込む。
+        列数の不一致やデコードエラーなど、標準のcsvモジュールと挙動が
+        異なる入力の場合はNoneを返し、呼び出し元で標準パーサーに切り替える。
+        ファイルはARROW_BLOCK_SIZEずつ読み込まれる
+        """
+        try:
+            table = pacsv.read_csv(
+                file_obj,
+                read_options=pacsv.ReadOptions(
+                    encoding=encoding,
+                    block_size=self.ARROW_BLOCK_SIZE
+                ),
+                parse_options=pacsv.ParseOptions(
+                    delimiter=delimiter,
+                    newlines_in_values=True
+                ),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={column: pa.string() for column in columns}
+                )
+            )
+        except (pa.ArrowInvalid, UnicodeError, LookupError) as e:
+            logger.info(f"ℹ️ pyarrowでの解析をスキップ、標準パーサーを使用: {e}")
+            return None
+        
+        # 緯度・経度カラムは列単位でまとめて数値に変換する
+        column_map = self._detect_column_mapping(columns)
+        for field_name in self.COORDINATE_FIELDS:
+            column = column_map.get(field_name)
+            if column is None:
+                continue
+            index = table.schema.get_field_index(column)
+            coordinates = self._cast_coordinates(table.column(index))
+            if coordinates is not None:
+                table = table.set_column(index, column, coordinates)
+        
+        return (row for batch in table.to_batches() for row in batch.to_pylist())
+    
+    def _cast_coordinates(self, values: 'pa.ChunkedArray') -> Optional['pa.ChunkedArray']:
+        """
+        文字列の座標カラムをfloat64に一括変換する（空欄はNull）
+        
+        数値として解釈できない値が1つでもあればNoneを返す。
+        その場合は行ごとの変換でエラーメッセージを生成する
+        """
+        trimmed = pc.utf8_trim_whitespace(values)
+        try:
+            return pc.cast(
+                pc.if_else(pc.equal(trimmed, ''), None, trimmed),
+                pa.float64()
+            )
+        except pa.ArrowInvalid:
+            return None
     
     def _detect_column_mapping(self, columns: List[str]) -> Dict[str, str]:
         """
@@ -520,42 +815,83 @@ class CulturalPropertyCSVImporter:
         Returns:
             {内部フィールド名: CSVカラム名} の辞書
         """
+        # 同じヘッダーの再プレビューではキャッシュ済みの結果を使う
+        return dict(self._lookup_column_mapping(tuple(columns)))
+    
+    @classmethod
+    @functools.lru_cache(maxsize=128)
+    def _lookup_column_mapping(cls, columns: Tuple[str, ...]) -> Dict[str, str]:
+        """ヘッダーのタプルからマッピングを求める（結果はlru_cacheで保持）"""
         mapping = {}
+        ranks = {}
         
-        for field_name, possible_columns in self.COLUMN_MAPPING.items():
-            for col_name in possible_columns:
-                if col_name in columns:
-                    mapping[field_name] = col_name
-                    break
+        for col_name in columns:
+            hit = cls._COLUMN_LOOKUP.get(col_name)
+            if hit is None:
+                continue
+            field_name, rank = hit
+            # 同じフィールドに複数の候補がある場合は優先順位の高い方を採用
+            if field_name not in ranks or rank < ranks[field_name]:
+                mapping[field_name] = col_name
+                ranks[field_name] = rank
         
-        return mapping
+        # COLUMN_MAPPINGの定義順に並べて返す
+        return {
+            field_name: mapping[field_name]
+            for field_name in cls.COLUMN_MAPPING
+            if field_name in mapping
+        }
+    
+    def _process_rows(
+        self,
+        rows_data: Iterator[Dict[str, Any]],
+        column_map: Dict[str, str]
+    ) -> List[ImportRow]:
+        """
+        全行を処理してImportRowのリストを生成
+        
+        1行あたりの検証は軽いため逐次処理する
+        （プロセスプールは行の受け渡しのコストが上回り、リクエスト処理中のforkも安全でない）
+        """
+        return [
+            self._process_row(row_data, idx, column_map)
+            for idx, row_data in enumerate(rows_data, start=1)
+        ]
     
     def _process_row(
         self,
-        row_data: Dict[str, str],
+        row_data: Dict[str, Any],
         row_number: int,
         column_map: Dict[str, str]
     ) -> ImportRow:
         """
         1行を処理してImportRowを生成
-        """
-        from cp_api.models import CulturalProperty
         
+        DBにはアクセスしない（既存データとの重複チェックは全行の処理後に_mark_duplicatesでまとめて行う）
+        """
         import_row = ImportRow(row_number=row_number)
-        import_row.raw_data = row_data
         
         # カラムマッピングに従ってデータを抽出
         for field_name, csv_column in column_map.items():
-            value = row_data.get(csv_column, '').strip()
+            value = row_data.get(csv_column, '')
+            
+            # pyarrowで変換済みの数値（またはNone）はそのまま使う
+            if not isinstance(value, str):
+                setattr(import_row, field_name, value)
+                continue
+            
+            value = value.strip()
             
             # 空文字列はNoneに変換
             if value == '':
                 value = None
             
-            # 数値フィールドの変換
-            if field_name in ['latitude', 'longitude'] and value:
+            # 数値への変換・分類や種類の文字列の共有
+            # （ValueErrorを送出するのは座標のfloat変換のみ）
+            converter = self._CONVERTERS.get(field_name)
+            if converter is not None and value:
                 try:
-                    value = float(value)
+                    value = converter(value)
                 except ValueError:
                     import_row.errors.append(f'{field_name}が数値ではありません: {value}')
                     import_row.status = ImportStatus.ERROR
@@ -581,19 +917,6 @@ class CulturalPropertyCSVImporter:
         if import_row.status != ImportStatus.ERROR:
             self._validate_row(import_row)
         
-        # 重複チェック
-        if import_row.status != ImportStatus.ERROR and self.check_duplicates:
-            if import_row.name and import_row.latitude and import_row.longitude:
-                duplicate = self._check_duplicate(
-                    import_row.name,
-                    import_row.latitude,
-                    import_row.longitude
-                )
-                if duplicate:
-                    import_row.status = ImportStatus.DUPLICATE
-                    import_row.duplicate_id = duplicate.id
-                    import_row.warnings.append(f'既存データと重複しています (ID: {duplicate.id})')
-        
         return import_row
     
     def _validate_row(self, row: ImportRow) -> None:
@@ -619,7 +942,7 @@ class CulturalPropertyCSVImporter:
                 row.status = ImportStatus.ERROR
         
         # URL形式チェック（警告のみ）
-        if row.url and not (row.url.startswith('http://') or row.url.startswith('https://')):
+        if row.url and not row.url.startswith(self.URL_SCHEMES):
             row.warnings.append(f'URLの形式が不正です: {row.url}')
             if row.status == ImportStatus.VALID:
                 row.status = ImportStatus.WARNING
@@ -633,50 +956,189 @@ class CulturalPropertyCSVImporter:
             row.errors.append(f'住所が長すぎます (最大254文字)')
             row.status = ImportStatus.ERROR
     
+    def _mark_duplicates(self, rows: List[ImportRow]) -> None:
+        """
+        エラー以外の行について重複チェックを行い、ステータスを更新する
+        """
+        targets = [
+            row for row in rows
+            if row.status != ImportStatus.ERROR
+            and row.name and row.latitude and row.longitude
+        ]
+        if not targets:
+            return
+        
+        index = self._build_duplicate_index(targets)
+        
+        for row in targets:
+            duplicate_id = self._check_duplicate(
+                index,
+                row.name,
+                row.latitude,
+                row.longitude
+            )
+            if duplicate_id:
+                row.status = ImportStatus.DUPLICATE
+                row.duplicate_id = duplicate_id
+                row.warnings.append(f'既存データと重複しています (ID: {duplicate_id})')
+    
+    def _build_duplicate_index(
+        self,
+        rows: List[ImportRow],
+        tolerance: float = DUPLICATE_TOLERANCE
+    ) -> Dict[str, List[Tuple[float, float, int]]]:
+        """
+        重複候補となる既存データを1回のクエリで取得し、名称ごとに索引化する
+        
+        CSV全体の名称と座標範囲（±tolerance）の矩形で候補を絞り込む。
+        矩形の判定はgeomのGiSTインデックスを使う&&演算子（bboverlaps）で行う
+        
+        Returns:
+            {名称: [(緯度, 経度, ID), ...]} の辞書
+        """
+        from cp_api.models import CulturalProperty
+        
+        names = {row.name for row in rows}
+        latitudes = [row.latitude for row in rows]
+        longitudes = [row.longitude for row in rows]
+        
+        bbox = Polygon.from_bbox((
+            min(longitudes) - tolerance,
+            min(latitudes) - tolerance,
+            max(longitudes) + tolerance,
+            max(latitudes) + tolerance,
+        ))
+        bbox.srid = 6668
+        
+        candidates = CulturalProperty.objects.filter(
+            name__in=names,
+            geom__bboverlaps=bbox
+        ).values_list('name', 'latitude', 'longitude', 'id')
+        
+        index: Dict[str, List[Tuple[float, float, int]]] = {}
+        for name, latitude, longitude, cp_id in candidates:
+            # 座標カラムが空のデータは従来どおり比較対象外
+            if latitude is None or longitude is None:
+                continue
+            index.setdefault(name, []).append((latitude, longitude, cp_id))
+        
+        return index
+    
     def _check_duplicate(
         self,
+        index: Dict[str, List[Tuple[float, float, int]]],
         name: str,
         latitude: float,
         longitude: float,
-        tolerance: float = 0.0001  # 約10m
-    ) -> Optional['CulturalProperty']:
+        tolerance: float = DUPLICATE_TOLERANCE
+    ) -> Optional[int]:
         """
         重複チェックを行う
         
-        同一名称かつ座標が近い（toleranceの範囲内）データを検索
-        """
-        from cp_api.models import CulturalProperty
-        
-        # 名称が完全一致し、座標が近いものを検索
-        duplicates = CulturalProperty.objects.filter(
-            name=name,
-            latitude__gte=latitude - tolerance,
-            latitude__lte=latitude + tolerance,
-            longitude__gte=longitude - tolerance,
-            longitude__lte=longitude + tolerance
-        )
+        同一名称かつ座標が近い（toleranceの範囲内）データを索引から検索
         
-        return duplicates.first()
+        Returns:
+            重複する既存データのID または None
+        """
+        for cp_latitude, cp_longitude, cp_id in index.get(name, ()):
+            if (abs(cp_latitude - latitude) <= tolerance
+                    and abs(cp_longitude - longitude) <= tolerance):
+                return cp_id
+        return None
     
     def _save_session(self, session_id: str, result: ImportPreviewResult) -> None:
-        """プレビュー結果をセッションに保存"""
-        cache.set(
-            f"csv_import_session:{session_id}",
-            result.to_dict(),
-            timeout=self.SESSION_TIMEOUT
-        )
+        """
+        プレビュー結果をセッションに保存
+        
+        pyarrowが使える場合は行データをArrow IPCファイルとしてディスクに書き出す
+        （キャッシュへのpickle保存を避け、複数ワーカー間でも共有できる）。
+        使えない場合はImportPreviewResultをそのままキャッシュに保存する
+        """
+        if pa is None:
+            cache.set(
+                f"csv_import_session:{session_id}",
+                result,
+                timeout=self.SESSION_TIMEOUT
+            )
+            logger.info(f"📝 セッション保存: {session_id}")
+            return
+        
+        os.makedirs(self.SESSION_DIR, exist_ok=True)
+        self._purge_expired_sessions()
+        
+        summary = result.to_dict()
+        del summary['rows']
+        table = pa.Table.from_pylist([row.to_dict() for row in result.rows])
+        table = table.replace_schema_metadata({'preview': json.dumps(summary)})
+        
+        # 書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+        path = self._session_path(session_id)
+        tmp_path = f'{path}.tmp'
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
         logger.info(f"📝 セッション保存: {session_id}")
     
-    def _get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+    def _get_session(self, session_id: str) -> Optional[ImportPreviewResult]:
         """セッションからプレビュー結果を取得"""
-        data = cache.get(f"csv_import_session:{session_id}")
+        if pa is None:
+            data = cache.get(f"csv_import_session:{session_id}")
+        else:
+            data = self._read_session_file(session_id)
+        
         if data:
             logger.info(f"📖 セッション取得: {session_id}")
         else:
             logger.warning(f"⚠️ セッションが見つかりません: {session_id}")
         return data
     
+    def _read_session_file(self, session_id: str) -> Optional[ImportPreviewResult]:
+        """Arrow IPCファイルからプレビュー結果を復元（期限切れ・不正なIDの場合はNone）"""
+        try:
+            path = self._session_path(session_id)
+        except ValueError:
+            return None
+        
+        try:
+            if time.time() - os.path.getmtime(path) > self.SESSION_TIMEOUT:
+                os.remove(path)
+                return None
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        
+        summary = json.loads(table.schema.metadata[b'preview'])
+        rows = [ImportRow.from_dict(data) for data in table.to_pylist()]
+        return ImportPreviewResult(rows=rows, **summary)
+    
+    def _session_path(self, session_id: str) -> str:
+        """
+        セッションIDに対応するArrow IPCファイルのパス
+        
+        セッションIDはリクエストから渡されるため、UUID以外はValueErrorとする
+        """
+        return os.path.join(self.SESSION_DIR, f'{uuid.UUID(session_id)}.arrow')
+    
+    def _purge_expired_sessions(self) -> None:
+        """有効期限を過ぎたセッションファイルを削除"""
+        now = time.time()
+        with os.scandir(self.SESSION_DIR) as entries:
+            for entry in entries:
+                try:
+                    if now - entry.stat().st_mtime > self.SESSION_TIMEOUT:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+    
     def _delete_session(self, session_id: str) -> None:
         """セッションを削除"""
-        cache.delete(f"csv_import_session:{session_id}")
+        if pa is None:
+            cache.delete(f"csv_import_session:{session_id}")
+        else:
+            try:
+                os.remove(self._session_path(session_id))
+            except (ValueError, OSError):
+                pass
         logger.info(f"🗑️ セッション削除: {session_id}")
@@ -11,16 +11,81 @@ cp_api/services/thumbnail.py
 """
 
 import re
+import codecs
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 from io import BytesIO
 from urllib.parse import unquote
 
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image, ImageOps
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+
+from cp_api.cache import invalidate_list_cache
 
 logger = logging.getLogger(__name__)
 
+# Luma URLからキャプチャIDを抽出する正規表現
+_CAPTURE_RE = re.compile(r'lumalabs\.ai/capture/([a-zA-Z0-9-]+)')
+
+# og:image メタタグからURLを抽出する正規表現（HTMLをデコードせずバイト列のまま検索する）
+# パターン1: content属性内のcdn-luma.com URL
+_OG_RE_1 = re.compile(rb'<meta[^>]*property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']')
+# パターン2: content属性が先に来る場合
+_OG_RE_2 = re.compile(rb'<meta[^>]*content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']')
+
+# og:image URLのsrcパラメータを抽出する正規表現
+_SRC_RE = re.compile(r'src=([^&]+)')
+
+# Lumaページの取得とサムネイルのダウンロードに使う共有セッション
+# （lumalabs.ai / cdn-luma.comへの接続をKeep-Aliveで使い回し、TLSハンドシェイクを省く）
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
+
+# サムネイルの出力サイズとJPEG品質
+THUMBNAIL_WIDTH = 400
+THUMBNAIL_HEIGHT = 300
+THUMBNAIL_QUALITY = 85
+
+# 生成したサムネイルをキャプチャIDごとにキャッシュする秒数
+THUMBNAIL_CACHE_TIMEOUT = 86400
+
+# LumaページのHTMLを読み込む単位と上限（バイト）
+# og:imageは<head>内にあるため、</head>まで読んだか上限に達したら打ち切る
+_OG_CHUNK_SIZE = 8192
+_OG_MAX_BYTES = 64 * 1024
+_HEAD_END = b'</head>'
+
+
+class _OGImageParser(HTMLParser):
+    """<meta property="og:image"> のcontent属性を取り出すHTMLパーサー"""
+    
+    def __init__(self):
+        super().__init__()
+        self.og_image = None
+    
+    def handle_starttag(self, tag, attrs):
+        if self.og_image is not None or tag != 'meta':
+            return
+        attrs = dict(attrs)
+        if attrs.get('property') == 'og:image' and attrs.get('content'):
+            self.og_image = attrs['content']
+
 
 def extract_capture_id(luma_url: str) -> str | None:
     """
@@ -35,17 +100,18 @@ def extract_capture_id(luma_url: str) -> str | None:
     if not luma_url:
         return None
     
-    match = re.search(r'lumalabs\.ai/capture/([a-zA-Z0-9-]+)', luma_url)
+    match = _CAPTURE_RE.search(luma_url)
     return match.group(1) if match else None
 
 
-def fetch_og_image_url(luma_url: str, timeout: int = 30) -> str | None:
+def fetch_og_image_url(luma_url: str, timeout: int = 30, raise_network_errors: bool = False) -> str | None:
     """
     LumaページのHTMLからOGP画像URLを抽出
     
     Args:
         luma_url: Luma AIのキャプチャページURL
         timeout: リクエストのタイムアウト秒数
+        raise_network_errors: 通信エラー（requests.RequestException）をNoneにせず送出するかどうか
     
     Returns:
         OGP画像URL（cdn-luma.comの直接URL） または None
@@ -53,35 +119,51 @@ def fetch_og_image_url(luma_url: str, timeout: int = 30) -> str | None:
     try:
         logger.info(f"📄 Fetching OGP image from: {luma_url}")
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        
-        response = requests.get(luma_url, headers=headers, timeout=timeout)
-        
-        if response.status_code != 200:
-            logger.warning(f"⚠️ Failed to fetch page: HTTP {response.status_code}")
-            return None
-        
-        html = response.text
+        # HTMLを少しずつ読み込み、og:imageが見つかった時点で接続を閉じる
+        with _SESSION.get(luma_url, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                logger.warning(f"⚠️ Failed to fetch page: HTTP {response.status_code}")
+                return None
+            
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            
+            parser = _OGImageParser()
+            chunks = []
+            read_bytes = 0
+            tail = b''
+            for chunk in response.iter_content(chunk_size=_OG_CHUNK_SIZE):
+                chunks.append(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.og_image:
+                    break
+                
+                # チャンクの境界をまたぐ</head>も検出できるよう直前の末尾を連結して調べる
+                read_bytes += len(chunk)
+                if read_bytes >= _OG_MAX_BYTES or _HEAD_END in tail + chunk:
+                    break
+                tail = chunk[-len(_HEAD_END):]
         
-        # og:image メタタグからURLを抽出
-        # パターン1: content属性内のcdn-luma.com URL
-        og_match = re.search(r'<meta[^>]*property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']', html)
-        if not og_match:
-            # パターン2: content属性が先に来る場合
-            og_match = re.search(r'<meta[^>]*content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']', html)
+        og_url = parser.og_image
         
-        if not og_match:
-            logger.warning("⚠️ og:image meta tag not found")
-            return None
+        if not og_url:
+            # パーサーで見つからなかった場合は正規表現で探す
+            html = b''.join(chunks)
+            og_match = _OG_RE_1.search(html) or _OG_RE_2.search(html)
+            
+            if not og_match:
+                logger.warning("⚠️ og:image meta tag not found")
+                return None
+            
+            og_url = og_match.group(1).decode('utf-8', 'replace')
         
-        og_url = og_match.group(1)
         logger.info(f"📍 Found og:image URL: {og_url}")
         
         # og:image URLからcdn-luma.comの直接URLを抽出
         # 形式: https://lumalabs.ai/api/og/image/capture?src=https%3A%2F%2Fcdn-luma.com%2F...%2F_thumb.jpg&type=captures
-        src_match = re.search(r'src=([^&]+)', og_url)
+        src_match = _SRC_RE.search(og_url)
         if src_match:
             encoded_url = src_match.group(1)
             cdn_url = unquote(encoded_url)
@@ -93,19 +175,24 @@ def fetch_og_image_url(luma_url: str, timeout: int = 30) -> str | None:
         
     except requests.Timeout:
         logger.error(f"❌ Timeout fetching page: {luma_url}")
+        if raise_network_errors:
+            raise
         return None
     except requests.RequestException as e:
         logger.error(f"❌ Error fetching page: {e}")
+        if raise_network_errors:
+            raise
         return None
 
 
-def download_thumbnail(image_url: str, timeout: int = 30) -> bytes | None:
+def download_thumbnail(image_url: str, timeout: int = 30, raise_network_errors: bool = False) -> bytes | None:
     """
     画像URLからサムネイル画像をダウンロード
     
     Args:
         image_url: 画像のURL（cdn-luma.comまたはその他）
         timeout: リクエストのタイムアウト秒数
+        raise_network_errors: 通信エラー（requests.RequestException）をNoneにせず送出するかどうか
     
     Returns:
         画像のバイナリデータ または None
@@ -113,11 +200,7 @@ def download_thumbnail(image_url: str, timeout: int = 30) -> bytes | None:
     try:
         logger.info(f"📥 Downloading thumbnail from: {image_url}")
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        
-        response = requests.get(image_url, headers=headers, timeout=timeout)
+        response = _SESSION.get(image_url, timeout=timeout)
         
         if response.status_code == 200:
             logger.info(f"✅ Successfully downloaded thumbnail ({len(response.content)} bytes)")
@@ -128,13 +211,22 @@ def download_thumbnail(image_url: str, timeout: int = 30) -> bytes | None:
             
     except requests.Timeout:
         logger.error(f"❌ Timeout downloading thumbnail from: {image_url}")
+        if raise_network_errors:
+            raise
         return None
     except requests.RequestException as e:
         logger.error(f"❌ Error downloading thumbnail: {e}")
+        if raise_network_errors:
+            raise
         return None
 
 
-def resize_thumbnail(image_data: bytes, width: int = 400, height: int = 300, quality: int = 90) -> bytes:
+def resize_thumbnail(
+    image_data: bytes,
+    width: int = THUMBNAIL_WIDTH,
+    height: int = THUMBNAIL_HEIGHT,
+    quality: int = THUMBNAIL_QUALITY
+) -> bytes:
     """
     サムネイル画像をリサイズ
     
@@ -148,35 +240,29 @@ def resize_thumbnail(image_data: bytes, width: int = 400, height: int = 300, qua
         リサイズ後の画像バイナリデータ
     """
     try:
+        # Image.openはヘッダーのみを読み、ピクセルのデコードは行わない
         img = Image.open(BytesIO(image_data))
         
+        # 既に目標サイズ以下のJPEGであれば、デコード・再エンコードせずにそのまま返す
+        if img.format == 'JPEG' and img.width <= width and img.height <= height:
+            return image_data
+        
+        # JPEGはデコード時にDCTスケーリングで目標の2倍程度まで縮小しておく
+        # （JPEG以外では何もしない。最終的なサイズはLANCZOSで合わせる）
+        img.draft('RGB', (width * 2, height * 2))
+        
         # RGBに変換（PNGなどの場合）
         if img.mode in ('RGBA', 'P'):
             img = img.convert('RGB')
         
-        # リサイズ（アスペクト比を維持してクロップ）
-        img_ratio = img.width / img.height
-        target_ratio = width / height
-        
-        if img_ratio > target_ratio:
-            # 画像が横長の場合、幅を基準にリサイズ
-            new_height = height
-            new_width = int(height * img_ratio)
-        else:
-            # 画像が縦長の場合、高さを基準にリサイズ
-            new_width = width
-            new_height = int(width / img_ratio)
-        
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # 中央からクロップ
-        left = (new_width - width) // 2
-        top = (new_height - height) // 2
-        img = img.crop((left, top, left + width, top + height))
+        # リサイズ（アスペクト比を維持して中央からクロップ）
+        # ImageOps.fitは切り出し範囲を指定して1回のresizeで処理する
+        img = ImageOps.fit(img, (width, height), method=Image.Resampling.LANCZOS, centering=(0.5, 0.5))
         
         # JPEG形式で出力
+        # ハフマンテーブルを再計算するoptimizeは使わず、プログレッシブ＋4:2:0で容量を抑える
         output = BytesIO()
-        img.save(output, format='JPEG', quality=quality, optimize=True)
+        img.save(output, format='JPEG', quality=quality, progressive=True, subsampling=2, optimize=False)
         
         return output.getvalue()
         
@@ -186,13 +272,15 @@ def resize_thumbnail(image_data: bytes, width: int = 400, height: int = 300, qua
         return image_data
 
 
-def generate_thumbnail_for_movie(movie, force: bool = False) -> bool:
+def generate_thumbnail_for_movie(movie, force: bool = False, raise_network_errors: bool = False) -> bool:
     """
     Movieのサムネイルを生成して保存
     
     Args:
         movie: Movieモデルのインスタンス
         force: 既存のサムネイルがあっても再生成するかどうか
+        raise_network_errors: 通信エラー（requests.RequestException）をFalseにせず送出するかどうか
+            （Celeryタスクから呼び出してリトライさせる場合にTrueにする）
     
     Returns:
         成功した場合はTrue、失敗した場合はFalse
@@ -209,24 +297,37 @@ def generate_thumbnail_for_movie(movie, force: bool = False) -> bool:
     
     logger.info(f"🎬 Generating thumbnail for Movie #{movie.id}")
     
-    # Step 1: LumaページからOGP画像URLを取得
-    og_image_url = fetch_og_image_url(movie.url)
-    if not og_image_url:
-        logger.error(f"❌ Failed to get OGP image URL for Movie #{movie.id}")
-        return False
+    # 同じキャプチャのサムネイルを生成済みであればキャッシュを使う
+    capture_id = extract_capture_id(movie.url)
+    cache_key = None
+    if capture_id:
+        cache_key = f"thumb:{capture_id}:{THUMBNAIL_WIDTH}x{THUMBNAIL_HEIGHT}q{THUMBNAIL_QUALITY}"
+    resized_data = cache.get(cache_key) if cache_key else None
     
-    # Step 2: サムネイル画像をダウンロード
-    image_data = download_thumbnail(og_image_url)
-    if not image_data:
-        logger.error(f"❌ Failed to download thumbnail for Movie #{movie.id}")
-        return False
-    
-    # Step 3: リサイズ
-    try:
-        resized_data = resize_thumbnail(image_data)
-    except Exception as e:
-        logger.error(f"❌ Failed to resize thumbnail for Movie #{movie.id}: {e}")
-        return False
+    if resized_data:
+        logger.info(f"♻️ Using cached thumbnail for capture {capture_id}")
+    else:
+        # Step 1: LumaページからOGP画像URLを取得
+        og_image_url = fetch_og_image_url(movie.url, raise_network_errors=raise_network_errors)
+        if not og_image_url:
+            logger.error(f"❌ Failed to get OGP image URL for Movie #{movie.id}")
+            return False
+        
+        # Step 2: サムネイル画像をダウンロード
+        image_data = download_thumbnail(og_image_url, raise_network_errors=raise_network_errors)
+        if not image_data:
+            logger.error(f"❌ Failed to download thumbnail for Movie #{movie.id}")
+            return False
+        
+        # Step 3: リサイズ
+        try:
+            resized_data = resize_thumbnail(image_data)
+        except Exception as e:
+            logger.error(f"❌ Failed to resize thumbnail for Movie #{movie.id}: {e}")
+            return False
+        
+        if cache_key:
+            cache.set(cache_key, resized_data, THUMBNAIL_CACHE_TIMEOUT)
     
     # Step 4: 保存
     try:
@@ -240,7 +341,15 @@ def generate_thumbnail_for_movie(movie, force: bool = False) -> bool:
                 pass
         
         # 新しいサムネイルを保存
-        movie.thumbnail.save(filename, ContentFile(resized_data), save=True)
+        # save()を経由せずthumbnail列だけを更新し、post_saveの再実行と全列のUPDATEを避ける
+        movie.thumbnail.save(filename, ContentFile(resized_data), save=False)
+        movie.updated_at = timezone.now()
+        type(movie).objects.filter(pk=movie.pk).update(
+            thumbnail=movie.thumbnail.name,
+            updated_at=movie.updated_at
+        )
+        # post_saveを経由しないため、文化財一覧（ネストしたthumbnail_url）のキャッシュを無効化する
+        invalidate_list_cache()
         
         logger.info(f"✅ Successfully saved thumbnail for Movie #{movie.id}: {movie.thumbnail.url}")
         return True
@@ -250,6 +359,37 @@ def generate_thumbnail_for_movie(movie, force: bool = False) -> bool:
         return False
 
 
+def generate_thumbnails_batch(movies, force: bool = False, max_workers: int = 8) -> dict[int, bool]:
+    """
+    複数のMovieのサムネイルを並列に生成して保存
+    
+    ダウンロード（ネットワーク待ち）とリサイズをスレッドプールで重ねて実行する。
+    HTTP接続は共有セッションで使い回される。
+    
+    Args:
+        movies: Movieモデルのインスタンスのイテラブル
+        force: 既存のサムネイルがあっても再生成するかどうか
+        max_workers: 同時に処理するムービー数
+    
+    Returns:
+        {Movie ID: 成功したかどうか} の辞書
+    """
+    def _generate(movie) -> bool:
+        try:
+            return generate_thumbnail_for_movie(movie, force=force)
+        except Exception as e:
+            logger.error(f"❌ Error generating thumbnail for Movie #{movie.id}: {e}")
+            return False
+        finally:
+            # ワーカースレッドが開いたDB接続を閉じる
+            connections.close_all()
+    
+    movies = list(movies)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(_generate, movies)
+        return {movie.id: result for movie, result in zip(movies, results)}
+
+
 def delete_thumbnail_for_movie(movie) -> bool:
     """
     Movieのサムネイルを削除
@@ -4,14 +4,19 @@ cp_api/signals.py
 Django Signals - モデル保存時のフック処理
 
 機能:
-- Movie保存後にサムネイルを自動生成
+- Movie保存後にサムネイルを自動生成（Celeryタスクとして非同期実行）
 - Movie削除時にサムネイルファイルも削除
+- 文化財・ムービー・画像・タグ・ユーザーの変更時に一覧のキャッシュを無効化
 """
 
 import logging
-from django.db.models.signals import post_save, pre_delete
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 
+from .cache import invalidate_list_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,9 +31,9 @@ def movie_post_save(sender, instance, created, **kwargs):
     
     Note:
     - 循環インポートを避けるため、関数内でインポート
-    - 非同期実行が望ましいが、シンプルさを優先して同期実行
+    - トランザクションのコミット後にCeleryタスクとして登録し、リクエストをブロックしない
     """
-    from .services.thumbnail import generate_thumbnail_for_movie
+    from .tasks import generate_thumbnail_task
     
     # サムネイル生成をスキップするフラグ（無限ループ防止）
     if getattr(instance, '_skip_thumbnail_generation', False):
@@ -56,19 +61,16 @@ def movie_post_save(sender, instance, created, **kwargs):
             logger.info(f"📷 Movie #{instance.id} has no thumbnail, will generate")
     
     if should_generate and instance.url:
-        try:
-            # 無限ループ防止フラグを設定
-            instance._skip_thumbnail_generation = True
-            
-            # サムネイル生成（強制再生成）
-            force = not created  # 更新時は強制再生成
-            generate_thumbnail_for_movie(instance, force=force)
-            
-        except Exception as e:
-            logger.error(f"❌ Error generating thumbnail for Movie #{instance.id}: {e}")
-        finally:
-            # フラグをリセット
-            instance._skip_thumbnail_generation = False
+        movie_id = instance.id
+        force = not created  # 更新時は強制再生成
+        
+        def enqueue():
+            try:
+                generate_thumbnail_task.delay(movie_id, force)
+            except Exception as e:
+                logger.error(f"❌ Error queueing thumbnail generation for Movie #{movie_id}: {e}")
+        
+        transaction.on_commit(enqueue)
 
 
 @receiver(pre_delete, sender='cp_api.Movie')
@@ -82,3 +84,34 @@ def movie_pre_delete(sender, instance, **kwargs):
             logger.info(f"🗑️ Deleted thumbnail file for Movie #{instance.id}")
         except Exception as e:
             logger.error(f"❌ Error deleting thumbnail file for Movie #{instance.id}: {e}")
+
+
+@receiver(post_save, sender='cp_api.CulturalProperty')
+@receiver(post_delete, sender='cp_api.CulturalProperty')
+@receiver(post_save, sender='cp_api.Movie')
+@receiver(post_delete, sender='cp_api.Movie')
+@receiver(post_save, sender='cp_api.ImageUpload')
+@receiver(post_delete, sender='cp_api.ImageUpload')
+@receiver(post_save, sender='cp_api.Tag')
+@receiver(post_delete, sender='cp_api.Tag')
+@receiver(m2m_changed, sender='cp_api.CulturalProperty_tags')
+def invalidate_cultural_property_list_cache(sender, **kwargs):
+    """
+    一覧に含まれるデータの変更時に文化財一覧のキャッシュを無効化
+    
+    コミット前に無効化すると、その間のリクエストが古いデータを再びキャッシュするため
+    トランザクションのコミット後に行う
+    """
+    transaction.on_commit(invalidate_list_cache)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_list_cache_on_user_change(sender, update_fields=None, **kwargs):
+    """
+    ユーザーの変更時に一覧のキャッシュを無効化（一覧には作成者の情報をネストして返す）
+    
+    ログイン時のlast_loginだけの更新では一覧の内容は変わらないため無効化しない
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(invalidate_list_cache)
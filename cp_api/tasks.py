@@ -0,0 +1,72 @@
+"""
+cp_api/tasks.py
+
+Celeryタスク
+
+機能:
+- Movieのサムネイル生成（thumbnailsキューで実行）
+- 複数Movieのサムネイル生成をワーカーに分散
+"""
+
+import logging
+
+import requests
+from celery import group, shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(requests.RequestException,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def generate_thumbnail_task(self, movie_id: int, force: bool = False) -> bool:
+    """
+    Movieのサムネイルを生成する
+    
+    Args:
+        movie_id: MovieのID
+        force: 既存のサムネイルがあっても再生成するかどうか
+    
+    Returns:
+        成功した場合はTrue、失敗した場合はFalse
+    
+    通信エラー（requests.RequestException）の場合は指数バックオフで最大5回リトライする
+    （ワーカーで実行される場合のみ。同期実行ではリトライせずFalseを返す）
+    """
+    from .models import Movie
+    from .services.thumbnail import generate_thumbnail_for_movie
+    
+    try:
+        movie = Movie.objects.get(pk=movie_id)
+    except Movie.DoesNotExist:
+        # キューに積まれている間に削除された場合
+        logger.warning(f"⚠️ Movie #{movie_id} not found, skipping thumbnail generation")
+        return False
+    
+    # 通信エラーは送出させ、autoretry_forで指数バックオフ付きのリトライを行う
+    # ブローカー未設定（CELERY_TASK_ALWAYS_EAGER）ではリクエストのスレッドで同期実行され、
+    # リトライも待ち時間なしでその場で繰り返されるため、送出せず1回だけ試す
+    return generate_thumbnail_for_movie(
+        movie, force=force, raise_network_errors=not self.request.is_eager
+    )
+
+
+def enqueue_thumbnail_generation(movie_ids, force: bool = False):
+    """
+    複数Movieのサムネイル生成をCeleryのgroupとして一括登録する
+    
+    各Movieは別々のタスクとなり、thumbnailsキューのワーカー間で並列に処理される
+    
+    Args:
+        movie_ids: MovieのIDのイテラブル
+        force: 既存のサムネイルがあっても再生成するかどうか
+    
+    Returns:
+        GroupResult
+    """
+    return group(
+        generate_thumbnail_task.s(movie_id, force) for movie_id in movie_ids
+    ).apply_async()
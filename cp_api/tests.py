@@ -1,3 +1,300 @@
-from django.test import TestCase
+import datetime
+import decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+import requests
+from celery.exceptions import Retry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.renderers import ORJSONRenderer
+
+from .models import CulturalProperty, Movie
+from .pagination import EstimatedCountLimitOffsetPagination
+from .services.csv_importer import CulturalPropertyCSVImporter
+from .tasks import generate_thumbnail_task
+
+
+class URLConfTests(TestCase):
+    """URLconfの読み込みと文化財一覧APIの疎通確認"""
+
+    def setUp(self):
+        # 一覧レスポンスのキャッシュが他のテストの結果を返さないようにする
+        cache.clear()
+
+    def test_urlconf_imports(self):
+        import_module(settings.ROOT_URLCONF)
+
+    def test_cultural_property_list(self):
+        CulturalProperty.objects.create(
+            name='テスト文化財',
+            type='建造物',
+            address='東京都千代田区',
+            latitude=35.0,
+            longitude=135.0,
+            geom=Point(135.0, 35.0, srid=6668),
+        )
+
+        response = self.client.get('/api/v1/cultural_properties/')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['name'], 'テスト文化財')
+        self.assertEqual(results[0]['geom'], 'SRID=6668;POINT (135 35)')
+
+
+class CSVEncodingDetectionTests(SimpleTestCase):
+    """CSVのエンコーディング自動判定"""
+
+    HEADER = '名称,住所,緯度,経度,種別\n'
+    ROW = '浅草寺,東京都台東区浅草2-3-1,35.7148,139.7967,寺院\n'
+
+    # (エンコード時のエンコーディング, 判定結果として許容するエンコーディング)
+    ENCODINGS = [
+        ('utf-8', {'utf-8'}),
+        ('utf-8-sig', {'utf-8-sig'}),
+        ('cp932', {'cp932'}),
+        ('euc-jp', {'euc-jp'}),
+        ('iso-2022-jp', {'iso-2022-jp'}),
+        ('utf-16-le', {'utf-16-le'}),
+    ]
+
+    def setUp(self):
+        self.importer = CulturalPropertyCSVImporter(check_duplicates=False)
+
+    def assertDetected(self, text):
+        for source, expected in self.ENCODINGS:
+            with self.subTest(encoding=source, length=len(text)):
+                self.assertIn(self.importer.detect_encoding(text.encode(source)), expected)
+
+    def test_short_csv(self):
+        for rows in range(1, 4):
+            self.assertDetected(self.HEADER + self.ROW * rows)
+
+    def test_large_csv(self):
+        rows = ''.join(
+            f'文化財{i},京都府京都市東山区清水{i}丁目,34.99,135.78,建造物\n' for i in range(2000)
+        )
+        self.assertDetected(self.HEADER + rows)
+
+    def test_preview_short_euc_jp(self):
+        content = (self.HEADER + self.ROW).encode('euc-jp')
+
+        result, _ = self.importer.preview(file_content=content, filename='euc.csv')
+
+        self.assertEqual(result.detected_encoding, 'euc-jp')
+        self.assertEqual([row.name for row in result.rows], ['浅草寺'])
+        self.assertEqual(result.error_rows, 0)
+
+
+class ThumbnailTaskRetryTests(TestCase):
+    """サムネイル生成タスクの通信エラー時のリトライ"""
+
+    def setUp(self):
+        # 同じキャプチャのサムネイルがキャッシュから使われないようにする
+        cache.clear()
+
+    def test_retries_on_connection_error(self):
+        movie = Movie.objects.create(url='https://lumalabs.ai/capture/test-capture')
+
+        with mock.patch(
+            'cp_api.services.thumbnail._SESSION.get',
+            side_effect=requests.ConnectionError('connection refused'),
+        ), mock.patch.object(generate_thumbnail_task, 'retry', side_effect=Retry()) as retry:
+            with self.assertRaises(Retry):
+                generate_thumbnail_task.run(movie.id)
+
+        retry.assert_called_once()
+        self.assertIsInstance(retry.call_args.kwargs['exc'], requests.ConnectionError)
+
+    def test_eager_run_does_not_retry(self):
+        movie = Movie.objects.create(url='https://lumalabs.ai/capture/test-capture')
+
+        with mock.patch(
+            'cp_api.services.thumbnail._SESSION.get',
+            side_effect=requests.ConnectionError('connection refused'),
+        ) as session_get, mock.patch.object(generate_thumbnail_task, 'retry') as retry:
+            result = generate_thumbnail_task.apply(args=(movie.id,))
+
+        self.assertTrue(result.successful())
+        self.assertFalse(result.result)
+        self.assertEqual(session_get.call_count, 1)
+        retry.assert_not_called()
+
+    def test_regenerate_reports_eager_failure(self):
+        # ブローカー未設定の本番環境と同じく同期実行させる
+        conf = generate_thumbnail_task.app.conf
+        self.addCleanup(setattr, conf, 'task_always_eager', conf.task_always_eager)
+        conf.task_always_eager = True
+
+        user = get_user_model().objects.create_user(
+            username='creator', email='creator@example.com', password='password'
+        )
+        movie = Movie.objects.create(url='https://lumalabs.ai/capture/test-capture', created_by=user)
+        self.client.force_login(user)
+
+        with mock.patch(
+            'cp_api.services.thumbnail._SESSION.get',
+            side_effect=requests.ConnectionError('connection refused'),
+        ) as session_get:
+            response = self.client.post(f'/api/v1/movies/{movie.id}/regenerate_thumbnail/')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('task_id', response.json())
+        self.assertEqual(session_get.call_count, 1)
+
+
+class EstimatedCountPaginationTests(TestCase):
+    """推定件数を使うページネーションの次ページ判定"""
+
+    def setUp(self):
+        for i in range(3):
+            CulturalProperty.objects.create(
+                name=f'文化財{i}',
+                type='建造物',
+                address='東京都千代田区',
+                geom=Point(139.0, 35.0, srid=6668),
+            )
+
+    def paginate(self, query):
+        paginator = EstimatedCountLimitOffsetPagination()
+        request = Request(APIRequestFactory().get(f'/api/v1/cultural_properties/{query}'))
+        rows = paginator.paginate_queryset(CulturalProperty.objects.order_by('id'), request)
+        return paginator.get_paginated_response([row.id for row in rows]).data
+
+    def test_next_link_does_not_depend_on_estimate(self):
+        # 統計情報が古く、推定値が実際の行数より少ない場合
+        with mock.patch.object(EstimatedCountLimitOffsetPagination, 'ESTIMATE_THRESHOLD', 0), \
+                mock.patch.object(EstimatedCountLimitOffsetPagination, '_estimate_count', return_value=1):
+            first = self.paginate('?limit=2')
+            last = self.paginate('?limit=2&offset=2')
+
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNotNone(first['next'])
+        self.assertEqual(len(last['results']), 1)
+        self.assertIsNone(last['next'])
+
+    def test_offset_past_end_does_not_inflate_count(self):
+        data = self.paginate('?limit=2&offset=1000')
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['count'], 3)
+        self.assertIsNone(data['next'])
+
+    def test_exact_count_without_estimate(self):
+        data = self.paginate('?limit=2')
+
+        self.assertEqual(data['count'], 3)
+        self.assertIsNotNone(data['next'])
+
+    def test_movie_list_next_link_with_underestimate(self):
+        for i in range(3):
+            Movie.objects.create(url=f'https://example.com/movie/{i}')
+
+        with mock.patch.object(EstimatedCountLimitOffsetPagination, 'ESTIMATE_THRESHOLD', 0), \
+                mock.patch.object(EstimatedCountLimitOffsetPagination, '_estimate_count', return_value=1):
+            response = self.client.get('/api/v1/movies/?limit=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['next'])
+
+
+class MovieListETagTests(TestCase):
+    """ムービー一覧のETag"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='creator', email='creator@example.com', password='password'
+        )
+        Movie.objects.create(url='https://example.com/movie/1', created_by=self.user)
+
+    def get_list(self, **headers):
+        return self.client.get('/api/v1/movies/', **headers)
+
+    def test_etag_differs_by_media_type(self):
+        json_response = self.get_list(HTTP_ACCEPT='application/json')
+        html_response = self.get_list(HTTP_ACCEPT='text/html')
+
+        self.assertNotEqual(json_response['ETag'], html_response['ETag'])
+        self.assertIn('Accept', json_response['Vary'])
+
+    def test_etag_changes_when_creator_is_updated(self):
+        etag = self.get_list(HTTP_ACCEPT='application/json')['ETag']
+
+        self.user.name = '新しい名前'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.get_list(HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['created_by']['name'], '新しい名前')
+
+    def test_etag_changes_when_movie_is_added(self):
+        etag = self.get_list(HTTP_ACCEPT='application/json')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(url='https://example.com/movie/2', created_by=self.user)
+        response = self.get_list(HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_etag_kept_on_login(self):
+        etag = self.get_list(HTTP_ACCEPT='application/json')['ETag']
+
+        # ログインではlast_loginだけが更新され、一覧の内容は変わらない
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.user)
+        response = self.get_list(HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_without_changes(self):
+        etag = self.get_list(HTTP_ACCEPT='application/json')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.get_list(HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """orjsonのレンダラーがDRF標準のJSONRendererと同じ出力になること"""
+
+    data = {
+        'name': '文化財\u2028改行\u2029段落',
+        'count': 3,
+        'ratio': 0.5,
+        'price': decimal.Decimal('1.50'),
+        'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+        'jst': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=9))),
+        'date': datetime.date(2024, 1, 2),
+        'tags': ('a', 'b'),
+        'nested': [{'id': 1, 'empty': None, 'flag': True}],
+    }
+
+    def test_matches_json_renderer(self):
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, 'application/json'),
+            JSONRenderer().render(self.data, 'application/json'),
+        )
+
+    def test_honors_indent(self):
+        for media_type, context in [('application/json; indent=4', {}), ('application/json', {'indent': 4})]:
+            self.assertEqual(
+                ORJSONRenderer().render(self.data, media_type, context),
+                JSONRenderer().render(self.data, media_type, context),
+            )
+
+    def test_falls_back_for_unsupported_values(self):
+        data = {'big': 2 ** 70}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
@@ -9,37 +9,88 @@ cp_api/views.py
 - perform_updateをオーバーライドして権限チェック
 - /my/エンドポイントを追加（自分が作成したデータを取得）
 - geomフィールドの自動生成処理を追加
-- regenerate_thumbnailアクションを追加（サムネイル再生成）
+- regenerate_thumbnailアクションを追加（サムネイル再生成、Celeryタスクに登録して202を返す）
 - CSVインポートAPIを追加（プレビュー・実行）
 - ✅ NEW: ordering_fieldsを追加（ソート機能）
 - ✅ NEW: search_fieldsを追加（検索機能）
 """
 
+import hashlib
 import logging
-from rest_framework import viewsets, status, filters
+from collections import defaultdict
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action, api_view, permission_classes as drf_permission_classes, parser_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.views import APIView
 from django.contrib.gis.geos import Point
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Movie, CulturalProperty, Tag
+from .models import Movie, CulturalProperty, ImageUpload, Tag
 from .serializers import (
     MovieSerializer, 
     CulturalPropertySerializer, 
     CulturalPropertyCreateSerializer,
     MovieCreateSerializer,
-    TagSerializer
+    TagSerializer,
+    UserBriefSerializer
 )
 from .filters import CulturalPropertyFilter, MovieFilter
+from .functions import AsEWKT
 from .permissions import IsOwnerOrReadOnly
-from .services.thumbnail import generate_thumbnail_for_movie
+from .pagination import EstimatedCountLimitOffsetPagination
+from .cache import LIST_CACHE_TIMEOUT, list_cache_key, list_cache_version, invalidate_list_cache
+from .tasks import generate_thumbnail_task
 from .services.csv_importer import CulturalPropertyCSVImporter
 
 logger = logging.getLogger(__name__)
 
+# リクエストパラメータの真偽値変換（'true'/'1'/'yes'やJSONのboolを受け付ける）
+_BOOL = serializers.BooleanField()
+# 簡易表示の一覧で日時をシリアライザーと同じ形式（ISO 8601、TIME_ZONE基準）にする
+_DATETIME = serializers.DateTimeField()
+
+# MovieSerializerで返すカラム（作成者はUserBriefSerializerの項目のみ読み込む）
+_MOVIE_READ_FIELDS = [
+    'id', 'url', 'title', 'note', 'cultural_property', 'created_by',
+    'created_at', 'updated_at', 'thumbnail',
+    *(f'created_by__{field}' for field in UserBriefSerializer.Meta.fields),
+]
+
+
+def _movie_etag(request, scope=''):
+    """
+    ムービー一覧のETagを一覧データの世代番号・レスポンスの形式から生成
+    
+    - ムービーの追加・更新・削除、ネストして返す作成者の更新はシグナルで世代番号が進む
+    - リクエストごとにテーブルを集計しないよう、キャッシュ上の世代番号だけを参照する
+    - JSONとBrowsable APIなど、レンダリング結果の形式ごとに別の値になる
+    """
+    # DRFのコンテンツネゴシエーションで決まったメディアタイプ（list()の呼び出し前に確定している）
+    media_type = getattr(request, 'accepted_media_type', '')
+    key = f"{list_cache_version()}-{scope}-{media_type}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _movie_list_etag(request, *args, **kwargs):
+    """ムービー一覧（全体）のETag"""
+    return _movie_etag(request)
+
+
+def _my_movie_list_etag(request, *args, **kwargs):
+    """自分が作成したムービー一覧のETag"""
+    if not request.user.is_authenticated:
+        return None
+    return _movie_etag(request, scope=f'user:{request.user.pk}')
+
 
 class CulturalPropertyViewSet(viewsets.ModelViewSet):
     """
@@ -53,9 +104,10 @@ class CulturalPropertyViewSet(viewsets.ModelViewSet):
     - ordering: ソート（created_at, updated_at, name）
     - search: 検索（name, name_en, address）
     """
-    queryset = CulturalProperty.objects.all().prefetch_related(
-        'movies', 'images', 'tags', 'created_by'
-    ).select_related('created_by')
+    queryset = CulturalProperty.objects.all()
+    
+    # 絞り込みのない一覧では件数を推定値で返す（大きなテーブルでのCOUNT(*)を避ける）
+    pagination_class = EstimatedCountLimitOffsetPagination
     
     # フィルタリング・ソート・検索設定
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
@@ -71,6 +123,12 @@ class CulturalPropertyViewSet(viewsets.ModelViewSet):
     # 認証・権限設定
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
+    # 簡易表示の一覧でそのまま返すカラム（CulturalPropertySerializerの項目順）
+    COMPACT_FIELDS = [
+        'id', 'name', 'name_kana', 'name_gener', 'name_en', 'category', 'type',
+        'place_name', 'address', 'latitude', 'longitude', 'url', 'note',
+    ]
+
     def get_serializer_class(self):
         """
         アクションに応じてシリアライザーを切り替え
@@ -79,6 +137,42 @@ class CulturalPropertyViewSet(viewsets.ModelViewSet):
             return CulturalPropertyCreateSerializer
         return CulturalPropertySerializer
 
+    def _is_compact(self):
+        """
+        一覧を簡易表示（関連データはIDのみ）で返すかどうか
+        
+        ?compact=true が指定された一覧系アクションのみ対象とし、
+        既存クライアント向けのレスポンス形式は変えない
+        """
+        if self.action not in ['list', 'my']:
+            return False
+        return _BOOL.to_internal_value(self.request.query_params.get('compact', False))
+
+    def get_queryset(self):
+        """
+        アクションに応じて関連データの取得方法を切り替え
+        
+        - 読み取り用シリアライザーを使うアクションのみ関連データをまとめて取得
+        - ムービーの作成者も同時に取得し、ムービーごとのクエリを発生させない
+        - geomのジオメトリ本体（WKB）はどのアクションでも読み込まない
+        """
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve', 'my']:
+            # geomはPostGIS側でEWKT文字列にしたものを受け取り、行ごとのGEOSオブジェクト生成を省く
+            queryset = queryset.annotate(geom_ewkt=AsEWKT('geom')).defer('geom')
+            if self._is_compact():
+                # 簡易表示はvalues()で取得し、関連データは_compact_rowsでまとめて取得する
+                return queryset
+            queryset = queryset.select_related('created_by').prefetch_related(
+                Prefetch('movies', queryset=Movie.objects.select_related('created_by').only(*_MOVIE_READ_FIELDS)),
+                'images',
+                'tags',
+            )
+        elif self.action in ['update', 'partial_update', 'destroy']:
+            # 更新・削除のレスポンスにgeomは含まれず、更新時も緯度・経度から作り直すため読み込まない
+            queryset = queryset.defer('geom')
+        return queryset
+
     def get_serializer_context(self):
         """
         シリアライザーにリクエストコンテキストを渡す
@@ -87,43 +181,111 @@ class CulturalPropertyViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
-    def perform_create(self, serializer):
+    def list(self, request, *args, **kwargs):
         """
-        文化財作成時にcreated_byとgeomを自動設定
+        文化財一覧を取得
+        
+        - ?compact=true の場合はシリアライザーを通さない簡易表示で返す
+        - 同じURLへのリクエストは短時間キャッシュした結果を返す（データ変更時は無効化）
+        """
+        cache_key = list_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        if self._is_compact():
+            response = self._compact_response(self.filter_queryset(self.get_queryset()))
+        else:
+            response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, LIST_CACHE_TIMEOUT)
+        return response
+
+    def _compact_response(self, queryset):
+        """
+        簡易表示の一覧レスポンスを生成
+        
+        モデルインスタンスを作らずvalues()の辞書をそのまま使い、
+        ムービー・画像・タグはIDのリスト、作成者はUserBriefSerializerと同じ項目で返す
+        """
+        page = self.paginate_queryset(queryset.values(
+            *self.COMPACT_FIELDS, 'geom_ewkt', 'created_by_id', 'created_at', 'updated_at'
+        ))
+        return self.get_paginated_response(self._compact_rows(page))
+
+    def _compact_rows(self, rows):
+        """
+        values()の行に関連データのIDを付けて、レスポンス用の辞書のリストにする
+        
+        関連テーブルはページ内の文化財IDでまとめて1回ずつ取得する
+        """
+        ids = [row['id'] for row in rows]
+        movies = defaultdict(list)
+        for cultural_property_id, movie_id in Movie.objects.filter(
+            cultural_property_id__in=ids
+        ).values_list('cultural_property_id', 'id'):
+            movies[cultural_property_id].append(movie_id)
+        images = defaultdict(list)
+        for cultural_property_id, image_id in ImageUpload.objects.filter(
+            cultural_property_id__in=ids
+        ).values_list('cultural_property_id', 'id'):
+            images[cultural_property_id].append(image_id)
+        tags = defaultdict(list)
+        for cultural_property_id, tag_id in CulturalProperty.tags.through.objects.filter(
+            culturalproperty_id__in=ids
+        ).values_list('culturalproperty_id', 'tag_id'):
+            tags[cultural_property_id].append(tag_id)
+        users = {
+            user['id']: user
+            for user in get_user_model().objects.filter(
+                id__in={row['created_by_id'] for row in rows if row['created_by_id']}
+            ).values(*UserBriefSerializer.Meta.fields)
+        }
+
+        return [
+            {
+                **{field: row[field] for field in self.COMPACT_FIELDS},
+                # CulturalPropertySerializer.get_geomと同じくGEOSの表記（"POINT (x y)"）に揃える
+                'geom': row['geom_ewkt'].replace('POINT(', 'POINT (', 1) if row['geom_ewkt'] else None,
+                'tags': tags[row['id']],
+                'movies': movies[row['id']],
+                'images': images[row['id']],
+                'created_by': users.get(row['created_by_id']),
+                'created_at': _DATETIME.to_representation(row['created_at']),
+                'updated_at': _DATETIME.to_representation(row['updated_at']),
+            }
+            for row in rows
+        ]
+
+    def _geom_from_request(self):
+        """
+        リクエストの緯度・経度からgeomを生成
+        
+        緯度・経度がない、または数値でない場合はNoneを返す
         """
-        # リクエストデータから緯度・経度を取得
         latitude = self.request.data.get('latitude')
         longitude = self.request.data.get('longitude')
         
-        # geomフィールドを生成
-        geom = None
-        if latitude and longitude:
-            try:
-                geom = Point(float(longitude), float(latitude), srid=6668)
-            except (ValueError, TypeError):
-                pass
-        
-        # geomが指定されていない場合はリクエストのgeomを使用
-        if geom:
-            serializer.save(created_by=self.request.user, geom=geom)
-        else:
-            serializer.save(created_by=self.request.user)
+        if not (latitude and longitude):
+            return None
+        try:
+            return Point(float(longitude), float(latitude), srid=6668)
+        except (ValueError, TypeError):
+            return None
+
+    def perform_create(self, serializer):
+        """
+        文化財作成時にcreated_byとgeomを自動設定
+        """
+        geom = self._geom_from_request()
+        serializer.save(created_by=self.request.user, **({'geom': geom} if geom else {}))
 
     def perform_update(self, serializer):
         """
         文化財更新時にgeomを自動更新
         """
-        latitude = self.request.data.get('latitude')
-        longitude = self.request.data.get('longitude')
-        
-        if latitude and longitude:
-            try:
-                geom = Point(float(longitude), float(latitude), srid=6668)
-                serializer.save(geom=geom)
-            except (ValueError, TypeError):
-                serializer.save()
-        else:
-            serializer.save()
+        geom = self._geom_from_request()
+        serializer.save(**({'geom': geom} if geom else {}))
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my(self, request):
@@ -132,23 +294,17 @@ class CulturalPropertyViewSet(viewsets.ModelViewSet):
         
         GET /api/cultural_property/my/
         """
-        queryset = self.queryset.filter(created_by=request.user)
+        queryset = self.get_queryset().filter(created_by=request.user)
         
         # フィルタリングを適用
         queryset = self.filter_queryset(queryset)
+        if self._is_compact():
+            return self._compact_response(queryset)
         
-        # ページネーション
+        # ページネーション（件数が多いユーザーでも全件をメモリに載せないよう必須とする）
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = CulturalPropertySerializer(
-                page, many=True, context={'request': request}
-            )
-            return self.get_paginated_response(serializer.data)
-
-        serializer = CulturalPropertySerializer(
-            queryset, many=True, context={'request': request}
-        )
-        return Response(serializer.data)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class MovieViewSet(viewsets.ModelViewSet):
@@ -164,9 +320,11 @@ class MovieViewSet(viewsets.ModelViewSet):
     - search: 検索（title, note）
     - regenerate_thumbnail: サムネイルを再生成
     """
-    queryset = Movie.objects.all().select_related(
-        'cultural_property', 'created_by'
-    )
+    # 文化財はIDのみ返すため結合しない（cultural_property_idで足りる）。作成者はネストして返すため結合する
+    queryset = Movie.objects.all().select_related('created_by')
+    
+    # 絞り込みのない一覧では件数を推定値で返す（大きなテーブルでのCOUNT(*)を避ける）
+    pagination_class = EstimatedCountLimitOffsetPagination
     
     # フィルタリング・ソート・検索設定
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
@@ -190,6 +348,15 @@ class MovieViewSet(viewsets.ModelViewSet):
             return MovieCreateSerializer
         return MovieSerializer
 
+    def get_queryset(self):
+        """
+        読み取り用のアクションではシリアライザーで使うカラムのみ取得する
+        """
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve', 'my']:
+            queryset = queryset.only(*_MOVIE_READ_FIELDS)
+        return queryset
+
     def get_serializer_context(self):
         """
         シリアライザーにリクエストコンテキストを渡す
@@ -204,30 +371,38 @@ class MovieViewSet(viewsets.ModelViewSet):
         """
         serializer.save(created_by=self.request.user)
 
+    @method_decorator(cache_control(public=True, max_age=60, stale_while_revalidate=300))
+    @method_decorator(vary_on_headers('Accept'))
+    @method_decorator(condition(etag_func=_movie_list_etag))
+    def list(self, request, *args, **kwargs):
+        """
+        ムービー一覧を取得
+        
+        CDN・ブラウザで60秒キャッシュし、変更がなければ304を返す
+        """
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(vary_on_headers('Accept'))
+    @method_decorator(condition(etag_func=_my_movie_list_etag))
     def my(self, request):
         """
         自分が作成したムービー一覧を取得
         
         GET /api/movie/my/
         """
-        queryset = self.queryset.filter(created_by=request.user)
+        queryset = self.get_queryset().filter(created_by=request.user)
         
         # フィルタリングを適用
         queryset = self.filter_queryset(queryset)
         
-        # ページネーション
+        # ページネーション（件数が多いユーザーでも全件をメモリに載せないよう必須とする）
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = MovieSerializer(
-                page, many=True, context={'request': request}
-            )
-            return self.get_paginated_response(serializer.data)
-
         serializer = MovieSerializer(
-            queryset, many=True, context={'request': request}
+            page, many=True, context={'request': request}
         )
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def regenerate_thumbnail(self, request, pk=None):
@@ -237,6 +412,9 @@ class MovieViewSet(viewsets.ModelViewSet):
         POST /api/movie/{id}/regenerate_thumbnail/
         
         権限: 作成者本人のみ
+        
+        生成はCeleryタスクとして登録し、完了を待たずに202を返す
+        （ブローカー未設定で同期実行された場合は、その結果を200または500で返す）
         """
         movie = self.get_object()
         
@@ -247,29 +425,44 @@ class MovieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # サムネイル生成
-        success = generate_thumbnail_for_movie(movie, force=True)
+        # Luma AIのURL以外は生成できないため、キューに積まずに返す
+        if not movie.url or 'lumalabs.ai' not in movie.url:
+            return Response(
+                {'error': 'サムネイル生成に失敗しました。Luma AIのURLを確認してください。'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # サムネイル生成をタスクとして登録
+        task = generate_thumbnail_task.delay(movie.id, True)
         
-        if success:
-            # 最新のデータを取得
+        # ブローカー未設定の環境では同期実行済みのため、その結果を返す
+        if task.ready():
+            if not (task.successful() and task.result):
+                return Response(
+                    {'error': 'サムネイル生成に失敗しました。Luma AIのURLを確認してください。'}, 
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
             movie.refresh_from_db()
             serializer = MovieSerializer(movie, context={'request': request})
             return Response({
                 'message': 'サムネイルを再生成しました',
                 'movie': serializer.data
             })
-        else:
-            return Response(
-                {'error': 'サムネイル生成に失敗しました。Luma AIのURLを確認してください。'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        
+        serializer = MovieSerializer(movie, context={'request': request})
+        return Response({
+            'message': 'サムネイルの再生成を開始しました',
+            'task_id': task.id,
+            'movie': serializer.data
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class TagViewSet(viewsets.ModelViewSet):
     """
     タグのCRUD操作を提供するViewSet
     """
-    queryset = Tag.objects.all().prefetch_related('cultural_properties')
+    # TagSerializerは文化財を含まないため、関連する文化財は取得しない
+    queryset = Tag.objects.all()
     serializer_class = TagSerializer
     filterset_fields = ['name']
     
@@ -327,16 +520,25 @@ class CSVImportPreviewView(APIView):
         
         # パラメータを取得
         encoding = request.data.get('encoding', 'utf-8')
-        check_duplicates = request.data.get('check_duplicates', 'true').lower() == 'true'
+        check_duplicates = _BOOL.to_internal_value(request.data.get('check_duplicates', True))
+        
+        importer = CulturalPropertyCSVImporter(check_duplicates=check_duplicates)
+        
+        # 指定されたエンコーディングはファイル先頭だけで検証し、合わなければ解析前に返す
+        if encoding and encoding != 'auto':
+            sample = file.read(importer.ENCODING_SAMPLE_SIZE)
+            file.seek(0)
+            if not importer.can_decode(sample, encoding):
+                detected = importer.detect_encoding(sample)
+                return Response(
+                    {'success': False, 'error': f'ファイルのエンコーディングが不正です。{encoding}以外のエンコーディング（推定: {detected}）を試してください。'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
         try:
-            # ファイル内容を読み込み
-            file_content = file.read()
-            
-            # インポーターでプレビュー
-            importer = CulturalPropertyCSVImporter(check_duplicates=check_duplicates)
+            # インポーターでプレビュー（アップロードファイルを読み込まずにそのまま渡す）
             result, session_id = importer.preview(
-                file_content=file_content,
+                file_obj=file,
                 filename=file.name,
                 encoding=encoding
             )
@@ -391,8 +593,8 @@ class CSVImportExecuteView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        skip_errors = request.data.get('skip_errors', True)
-        skip_duplicates = request.data.get('skip_duplicates', True)
+        skip_errors = _BOOL.to_internal_value(request.data.get('skip_errors', True))
+        skip_duplicates = _BOOL.to_internal_value(request.data.get('skip_duplicates', True))
         selected_rows = request.data.get('selected_rows')
         
         try:
@@ -400,11 +602,13 @@ class CSVImportExecuteView(APIView):
             importer = CulturalPropertyCSVImporter()
             result = importer.execute(
                 session_id=session_id,
-                user=request.user,
+                created_by=request.user,
                 skip_errors=skip_errors,
                 skip_duplicates=skip_duplicates,
-                selected_rows=selected_rows
+                selected_row_numbers=selected_rows
             )
+            # bulk_create・COPYではpost_saveが送られないため、一覧キャッシュをここで無効化する
+            invalidate_list_cache()
             
             return Response({
                 'success': True,